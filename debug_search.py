@@ -49,11 +49,11 @@ def debug_search_issue():
         first_chunk = chunks_with_embeddings.first()
         if hasattr(first_chunk, 'embedding') and first_chunk.embedding:
             stored_vector = first_chunk.embedding.vector
-            print(f"Stored embedding shape: {np.array(stored_vector).shape}")
+            print(f"Stored embedding shape: {stored_vector.to_numpy().shape}")
             print(f"Stored embedding type: {type(stored_vector)}")
             
             # Test manual similarity calculation
-            cosine_dist = np.linalg.norm(query_embedding - np.array(stored_vector))
+            cosine_dist = np.linalg.norm(query_embedding - stored_vector.to_numpy())
             print(f"Manual distance to first chunk: {cosine_dist}")
         
         # Test search without user filter
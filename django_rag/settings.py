@@ -27,23 +27,107 @@ load_dotenv()
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 
+def make_settings(env):
+    """
+    Build the settings that depend on the deployment environment from an
+    environment mapping
+    
+    Pure function of env, so configurations can be checked by calling it
+    with different mappings instead of mutating os.environ and reloading
+    this module.
+    """
+    railway_environment = env.get('RAILWAY_ENVIRONMENT')
+    
+    # SECURITY WARNING: don't run with debug turned on in production!
+    debug = env.get('DEBUG', 'True') == 'True' and not railway_environment
+    
+    values = {
+        # Railway deployment
+        'RAILWAY_ENVIRONMENT': railway_environment,
+        'DEBUG': debug,
+        # Allow all hosts for Railway deployment
+        'ALLOWED_HOSTS': ['*'] if railway_environment else ['testserver', 'localhost', '127.0.0.1'],
+    }
+    
+    # Keep connections open across requests instead of reconnecting (and, on
+    # Railway, redoing the TLS handshake) each time; 0 closes them per request
+    conn_max_age = int(env.get('DB_CONN_MAX_AGE', '600'))
+    
+    # Database Configuration - Railway and Local Support
+    # Check if we're on Railway (has PGDATABASE from Railway's PostgreSQL service)
+    if env.get('PGDATABASE'):
+        # Railway deployment - use Railway's PostgreSQL variables
+        database = {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': env.get('PGDATABASE'),
+            'USER': env.get('PGUSER'),
+            'PASSWORD': env.get('PGPASSWORD'),
+            'HOST': env.get('PGHOST'),
+            'PORT': env.get('PGPORT'),
+            'CONN_MAX_AGE': conn_max_age,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'connect_timeout': 10,
+            },
+        }
+    elif dj_database_url and env.get('DATABASE_URL'):
+        # Alternative Railway setup with DATABASE_URL
+        database = dj_database_url.parse(
+            env['DATABASE_URL'],
+            conn_max_age=conn_max_age,
+            conn_health_checks=True,
+        )
+    else:
+        # Local development - use local environment variables with defaults
+        database = {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': env.get('DB_NAME', 'rag_system'),
+            'USER': env.get('DB_USER', 'joe'),
+            'PASSWORD': env.get('DB_PASSWORD', ''),
+            'HOST': env.get('DB_HOST', 'localhost'),
+            'PORT': env.get('DB_PORT', '5432'),
+            'CONN_MAX_AGE': conn_max_age,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'connect_timeout': 10,
+            },
+        }
+    values['DATABASES'] = {'default': database}
+    
+    # Railway production settings
+    if railway_environment:
+        values.update({
+            # Security settings for production
+            'SECURE_BROWSER_XSS_FILTER': True,
+            'SECURE_CONTENT_TYPE_NOSNIFF': True,
+            'X_FRAME_OPTIONS': 'DENY',
+            'SECURE_HSTS_SECONDS': 86400,
+            'SECURE_HSTS_INCLUDE_SUBDOMAINS': True,
+            'SECURE_HSTS_PRELOAD': True,
+            
+            # CSRF settings
+            'CSRF_COOKIE_SECURE': True,
+            'SESSION_COOKIE_SECURE': True,
+            
+            # CSRF trusted origins for Railway
+            'CSRF_TRUSTED_ORIGINS': [
+                'https://*.railway.app',
+                'https://*.up.railway.app',
+            ],
+        })
+    
+    return values
+
+
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/4.2/howto/deployment/checklist/
 
 # SECURITY WARNING: keep the secret key used in production secret!
 SECRET_KEY = os.getenv('SECRET_KEY', 'django-insecure-kx%43$u2i=ar61hjzt@^=8xy=tq%7h2%ce&!9u_)99%)gwp%!9')
 
-# SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = os.getenv('DEBUG', 'True') == 'True'
-
-# Railway deployment
-RAILWAY_ENVIRONMENT = os.getenv('RAILWAY_ENVIRONMENT')
-if RAILWAY_ENVIRONMENT:
-    DEBUG = False
-
-ALLOWED_HOSTS = ['*']  # Allow all hosts for Railway deployment
-if not RAILWAY_ENVIRONMENT:
-    ALLOWED_HOSTS = ['testserver', 'localhost', '127.0.0.1']
+# Environment-dependent settings: DEBUG, ALLOWED_HOSTS, DATABASES and the
+# production security settings (see make_settings above)
+globals().update(make_settings(os.environ))
 
 
 # Application definition
@@ -94,49 +178,7 @@ WSGI_APPLICATION = 'django_rag.wsgi.application'
 # Database Configuration
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
-# Database Configuration - Railway and Local Support
-# Railway provides individual PG variables, build DATABASE_URL if needed
-
-# Check if we're on Railway (has PGDATABASE from Railway's PostgreSQL service)
-if os.getenv('PGDATABASE'):
-    # Railway deployment - use Railway's PostgreSQL variables
-    DATABASES = {
-        'default': {
-            'ENGINE': 'django.db.backends.postgresql',
-            'NAME': os.getenv('PGDATABASE'),
-            'USER': os.getenv('PGUSER'),
-            'PASSWORD': os.getenv('PGPASSWORD'),
-            'HOST': os.getenv('PGHOST'),
-            'PORT': os.getenv('PGPORT'),
-            'OPTIONS': {
-                'connect_timeout': 10,
-            },
-        }
-    }
-elif dj_database_url and os.getenv('DATABASE_URL'):
-    # Alternative Railway setup with DATABASE_URL
-    DATABASES = {
-        'default': dj_database_url.config(
-            default=os.getenv('DATABASE_URL'),
-            conn_max_age=600,
-            conn_health_checks=True,
-        )
-    }
-else:
-    # Local development - use local environment variables with defaults
-    DATABASES = {
-        'default': {
-            'ENGINE': 'django.db.backends.postgresql',
-            'NAME': os.getenv('DB_NAME', 'rag_system'),
-            'USER': os.getenv('DB_USER', 'joe'),
-            'PASSWORD': os.getenv('DB_PASSWORD', ''),
-            'HOST': os.getenv('DB_HOST', 'localhost'),
-            'PORT': os.getenv('DB_PORT', '5432'),
-            'OPTIONS': {
-                'connect_timeout': 10,
-            },
-        }
-    }
+# DATABASES (local, Railway PG variables or DATABASE_URL) is built by make_settings above
 
 
 # Password validation
@@ -183,25 +225,13 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
-# Railway production settings
-if RAILWAY_ENVIRONMENT:
-    # Security settings for production
-    SECURE_BROWSER_XSS_FILTER = True
-    SECURE_CONTENT_TYPE_NOSNIFF = True
-    X_FRAME_OPTIONS = 'DENY'
-    SECURE_HSTS_SECONDS = 86400
-    SECURE_HSTS_INCLUDE_SUBDOMAINS = True
-    SECURE_HSTS_PRELOAD = True
-    
-    # CSRF settings
-    CSRF_COOKIE_SECURE = True
-    SESSION_COOKIE_SECURE = True
-    
-    # CSRF trusted origins for Railway
-    CSRF_TRUSTED_ORIGINS = [
-        'https://*.railway.app',
-        'https://*.up.railway.app',
-    ]
+# Embedding model: device for sentence-transformers (None = auto-detect) and
+# whether to load it when the app starts instead of on the first query
+EMBEDDING_DEVICE = os.getenv('EMBEDDING_DEVICE') or None
+LOAD_EMBEDDING_MODEL_ON_STARTUP = os.getenv('LOAD_EMBEDDING_MODEL_ON_STARTUP', str(not DEBUG)) == 'True'
+
+# Threads that chunk and embed uploaded documents; they share one embedding model
+DOCUMENT_PROCESSING_WORKERS = int(os.getenv('DOCUMENT_PROCESSING_WORKERS', '1'))
 
 # Login URLs
 LOGIN_URL = '/admin/login/'
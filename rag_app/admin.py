@@ -8,15 +8,19 @@ class DocumentAdmin(admin.ModelAdmin):
     list_display = ['title', 'file_name', 'file_type', 'status', 'chunk_count', 'uploaded_by', 'uploaded_at']
     list_filter = ['status', 'file_type', 'uploaded_at']
     search_fields = ['title', 'file_name', 'content']
-    readonly_fields = ['id', 'content_hash', 'chunk_count', 'uploaded_at', 'processed_at']
+    readonly_fields = ['id', 'content_hash_hex', 'chunk_count', 'uploaded_at', 'processed_at']
     ordering = ['-uploaded_at']
     
+    def content_hash_hex(self, obj):
+        return bytes(obj.content_hash).hex() if obj.content_hash else ''
+    content_hash_hex.short_description = 'Content hash'
+    
     fieldsets = (
         ('Basic Information', {
             'fields': ('title', 'file_name', 'file_type', 'mime_type')
         }),
         ('Content', {
-            'fields': ('content', 'content_hash'),
+            'fields': ('content', 'content_hash_hex'),
             'classes': ('collapse',)
         }),
         ('Processing', {
@@ -154,7 +158,7 @@ class ConversationHistoryAdmin(admin.ModelAdmin):
                    'total_response_time_ms', 'is_bookmarked', 'user_rating', 'created_at']
     list_filter = ['response_source', 'is_bookmarked', 'user_rating', 'created_at']
     search_fields = ['query_text', 'response_text', 'session__user__username']
-    readonly_fields = ['id', 'query_hash', 'search_time_ms', 'generation_time_ms', 
+    readonly_fields = ['id', 'query_hash_hex', 'search_time_ms', 'generation_time_ms', 
                       'total_response_time_ms', 'created_at']
     ordering = ['-created_at']
     filter_horizontal = ['documents_used']
@@ -167,9 +171,13 @@ class ConversationHistoryAdmin(admin.ModelAdmin):
         return obj.query_text[:50] + "..." if len(obj.query_text) > 50 else obj.query_text
     query_preview.short_description = 'Query'
     
+    def query_hash_hex(self, obj):
+        return bytes(obj.query_hash).hex() if obj.query_hash else ''
+    query_hash_hex.short_description = 'Query hash'
+    
     fieldsets = (
         ('Query Information', {
-            'fields': ('session', 'query_text', 'query_hash')
+            'fields': ('session', 'query_text', 'query_hash_hex')
         }),
         ('Response', {
             'fields': ('response_text', 'response_source')
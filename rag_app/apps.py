@@ -1,6 +1,25 @@
+import os
+import sys
+
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class RagAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'rag_app'
+
+    def ready(self):
+        from . import signals  # noqa: F401  (registers receivers)
+
+        # Warm the shared embedding model so the first query doesn't pay the load.
+        # Skipped for management commands other than runserver (migrate, collectstatic, ...)
+        if not getattr(settings, 'LOAD_EMBEDDING_MODEL_ON_STARTUP', False):
+            return
+        if os.path.basename(sys.argv[0]) == 'manage.py' and 'runserver' not in sys.argv:
+            return
+
+        from .embedding_utils import get_sentence_transformer
+
+        model_name = os.getenv('EMBEDDINGS_MODEL', 'all-mpnet-base-v2')
+        get_sentence_transformer(model_name)
@@ -6,12 +6,12 @@ import time
 import logging
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 
 from .models import Document
-from .rag_engine import RAGQueryEngine
+from .rag_engine import get_rag_engine
 from .conversation_handler import get_conversation_handler
 from .openrouter_client import get_openrouter_client
 
@@ -47,6 +47,104 @@ def chat_interface(request):
     return render(request, 'rag_app/chat.html', context)
 
 
+def _selected_model(request):
+    """Model chosen in the session, falling back to the client default"""
+    selected_model = request.session.get('selected_model')
+    if not selected_model:
+        try:
+            client = get_openrouter_client()
+            selected_model = client.default_model
+        except Exception:
+            selected_model = 'google/gemini-2.5-flash'
+    return selected_model
+
+
+def _conversational_reply(request, message, selected_model):
+    """
+    Reply to greetings and capability questions without document search
+    
+    Returns:
+        The reply text, or None if the message should go through RAG
+    """
+    # Check if this is a conversational query first
+    conversation_handler = get_conversation_handler()
+    
+    # First try to get an LLM-generated conversational response
+    conversational_response = None
+    try:
+        # For greetings and simple queries, use the LLM for more natural responses
+        if conversation_handler.classify_query(message) in ['greeting', 'hear_me', 'capability']:
+            client = get_openrouter_client()
+            
+            # Create a more dynamic prompt
+            doc_count = Document.objects.filter(uploaded_by=request.user).count()
+            doc_info = f"The user has {doc_count} documents uploaded" if doc_count else "The user hasn't uploaded any documents yet"
+            
+            prompt = f"""You are a helpful AI assistant for a document search system. 
+            
+User's message: "{message}"
+Context: {doc_info}
+
+Respond naturally and helpfully. If it's a greeting, be welcoming and explain what you can do. If they're asking about capabilities, explain the document search features. Keep it conversational and friendly, not robotic.
+
+Be specific about the document search capabilities:
+- Semantic search across uploaded documents
+- AI-powered answers with source citations
+- Support for PDFs, Word docs, and other formats
+- Multiple AI model options (Claude, GPT-4, Gemini, etc.)
+
+Keep your response concise but informative."""
+
+            # Try with rate limiting protection
+            try:
+                llm_response = client.simple_chat(
+                    prompt=prompt,
+                    model=selected_model,
+                    max_tokens=200,
+                    temperature=0.7
+                )
+                
+                if llm_response and llm_response.strip():
+                    conversational_response = llm_response.strip()
+                    
+            except Exception as llm_error:
+                logger.warning(f"LLM call failed: {llm_error}")
+                # Fall back to conversation handler
+                conversational_response = conversation_handler.handle_conversational_query(message, request.user)
+    
+    except Exception as e:
+        logger.warning(f"LLM conversational response failed: {e}")
+        # Fall back to conversation handler
+        conversational_response = conversation_handler.handle_conversational_query(message, request.user)
+    
+    return conversational_response
+
+
+def _rag_payload(response, total_time):
+    """JSON payload for a RAG answer, as the chat frontend expects it"""
+    # Format sources for frontend
+    sources = []
+    for search_result in response.source_chunks:
+        sources.append({
+            'document_title': search_result.chunk.document.title,
+            'page_number': search_result.chunk.page_number if hasattr(search_result.chunk, 'page_number') else None,
+            'similarity': round(search_result.similarity_score, 3)
+        })
+    
+    return {
+        'success': True,
+        'response': response.response,
+        'model': response.llm_model,
+        'total_time': round(total_time, 2),
+        'search_time': round(response.search_time, 2),
+        'llm_time': round(response.llm_time, 2),
+        'chunks_found': response.total_chunks_found,
+        'sources': sources,
+        'cached': response.cached,
+        'is_conversational': False
+    }
+
+
 @login_required
 @require_http_methods(["POST"])
 def chat_query(request):
@@ -67,66 +165,10 @@ def chat_query(request):
         start_time = time.time()
         
         # Get selected model from session
-        selected_model = request.session.get('selected_model')
-        if not selected_model:
-            try:
-                client = get_openrouter_client()
-                selected_model = client.default_model
-            except Exception:
-                selected_model = 'google/gemini-2.5-flash'
-        
-        # Check if this is a conversational query first
-        conversation_handler = get_conversation_handler()
-        user_has_docs = Document.objects.filter(uploaded_by=request.user).exists()
-        
-        # First try to get an LLM-generated conversational response
-        conversational_response = None
-        try:
-            # For greetings and simple queries, use the LLM for more natural responses
-            if conversation_handler.classify_query(message) in ['greeting', 'hear_me', 'capability']:
-                client = get_openrouter_client()
-                
-                # Create a more dynamic prompt
-                doc_info = f"The user has {Document.objects.filter(uploaded_by=request.user).count()} documents uploaded" if user_has_docs else "The user hasn't uploaded any documents yet"
-                
-                prompt = f"""You are a helpful AI assistant for a document search system. 
-                
-User's message: "{message}"
-Context: {doc_info}
-
-Respond naturally and helpfully. If it's a greeting, be welcoming and explain what you can do. If they're asking about capabilities, explain the document search features. Keep it conversational and friendly, not robotic.
-
-Be specific about the document search capabilities:
-- Semantic search across uploaded documents
-- AI-powered answers with source citations
-- Support for PDFs, Word docs, and other formats
-- Multiple AI model options (Claude, GPT-4, Gemini, etc.)
-
-Keep your response concise but informative."""
-
-                # Try with rate limiting protection
-                try:
-                    llm_response = client.simple_chat(
-                        prompt=prompt,
-                        model=selected_model,
-                        max_tokens=200,
-                        temperature=0.7
-                    )
-                    
-                    if llm_response and llm_response.strip():
-                        conversational_response = llm_response.strip()
-                        
-                except Exception as llm_error:
-                    logger.warning(f"LLM call failed: {llm_error}")
-                    # Fall back to conversation handler
-                    conversational_response = conversation_handler.handle_conversational_query(message, request.user)
-        
-        except Exception as e:
-            logger.warning(f"LLM conversational response failed: {e}")
-            # Fall back to conversation handler
-            conversational_response = conversation_handler.handle_conversational_query(message, request.user)
+        selected_model = _selected_model(request)
         
         # If we got an LLM conversational response, use it
+        conversational_response = _conversational_reply(request, message, selected_model)
         if conversational_response:
             total_time = time.time() - start_time
             return JsonResponse({
@@ -141,11 +183,8 @@ Keep your response concise but informative."""
         # Otherwise, proceed with RAG processing for document queries
         logger.info(f"Processing RAG query: {message}")
         
-        engine = RAGQueryEngine()
-        
         # Override configuration with selected model
-        if selected_model:
-            engine.config.llm_model = selected_model
+        engine = get_rag_engine(llm_model=selected_model or None)
         
         # Process the query
         response = engine.query(
@@ -154,28 +193,9 @@ Keep your response concise but informative."""
             session_id=conversation_id
         )
         
-        # Format sources for frontend
-        sources = []
-        for search_result in response.source_chunks:
-            sources.append({
-                'document_title': search_result.chunk.document.title,
-                'page_number': search_result.chunk.page_number if hasattr(search_result.chunk, 'page_number') else None,
-                'similarity': round(search_result.similarity_score, 3)
-            })
-        
         total_time = time.time() - start_time
         
-        return JsonResponse({
-            'success': True,
-            'response': response.response,
-            'model': response.llm_model,
-            'total_time': round(total_time, 2),
-            'search_time': round(response.search_time, 2),
-            'llm_time': round(response.llm_time, 2),
-            'chunks_found': response.total_chunks_found,
-            'sources': sources,
-            'is_conversational': False
-        })
+        return JsonResponse(_rag_payload(response, total_time))
         
     except Exception as e:
         logger.error(f"Chat query failed: {e}")
@@ -183,3 +203,70 @@ Keep your response concise but informative."""
             'success': False,
             'error': str(e)
         })
+
+
+def _sse(event):
+    """Encode one server-sent event"""
+    return f"data: {json.dumps(event)}\n\n"
+
+
+@login_required
+@require_http_methods(["POST"])
+def chat_query_stream(request):
+    """
+    Handle chat queries as a server-sent event stream
+    
+    Emits {"type": "delta", "text": ...} events while the answer is generated,
+    then one {"type": "done", ...} event carrying the same payload chat_query
+    returns, or {"type": "error", "error": ...}.
+    """
+    try:
+        data = json.loads(request.body)
+    except json.JSONDecodeError:
+        return JsonResponse({'success': False, 'error': 'Invalid JSON'}, status=400)
+    
+    message = data.get('message', '').strip()
+    conversation_id = data.get('conversation_id')
+    if not message:
+        return JsonResponse({'success': False, 'error': 'Message is required'})
+    
+    def events():
+        start_time = time.time()
+        try:
+            selected_model = _selected_model(request)
+            
+            conversational_response = _conversational_reply(request, message, selected_model)
+            if conversational_response:
+                yield _sse({
+                    'type': 'done',
+                    'success': True,
+                    'response': conversational_response,
+                    'model': selected_model,
+                    'total_time': round(time.time() - start_time, 2),
+                    'is_conversational': True,
+                    'sources': []
+                })
+                return
+            
+            logger.info(f"Processing streaming RAG query: {message}")
+            engine = get_rag_engine(llm_model=selected_model or None)
+            
+            for kind, value in engine.stream_query(
+                query_text=message,
+                user=request.user,
+                session_id=conversation_id
+            ):
+                if kind == 'delta':
+                    yield _sse({'type': 'delta', 'text': value})
+                else:
+                    yield _sse({'type': 'done', **_rag_payload(value, time.time() - start_time)})
+        
+        except Exception as e:
+            logger.error(f"Streaming chat query failed: {e}")
+            yield _sse({'type': 'error', 'success': False, 'error': str(e)})
+    
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    # Keep proxies from buffering the stream
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
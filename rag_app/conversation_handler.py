@@ -3,7 +3,7 @@ Conversation handler for casual and system queries
 """
 import re
 import random
-from typing import Optional, Dict, Any
+from typing import Any, Callable, Dict, Optional, Union
 from django.contrib.auth.models import User
 
 
@@ -171,23 +171,29 @@ Ready to get started?"""
         # If it's a document query, return None so the RAG engine handles it
         return None
     
-    def get_context_aware_response(self, query: str, user: Optional[User] = None, has_documents: bool = False) -> Optional[str]:
+    def get_context_aware_response(
+        self, query: str, user: Optional[User] = None, has_documents: Union[bool, Callable[[], bool]] = False
+    ) -> Optional[str]:
         """
         Generate context-aware conversational response
         
         Args:
             query: User's query
             user: Authenticated user
-            has_documents: Whether user has uploaded documents
+            has_documents: Whether user has uploaded documents, or a callable
+                returning it; only evaluated for conversational queries
             
         Returns:
             Contextual response or None for document queries
         """
         response = self.handle_conversational_query(query, user)
         
-        if response and not has_documents and user and user.is_authenticated:
-            # Add helpful guidance for users with no documents
-            response += "\n\n🚀 **Get Started**: Upload your first document using the drag & drop area above!"
+        if response and user and user.is_authenticated:
+            if callable(has_documents):
+                has_documents = has_documents()
+            if not has_documents:
+                # Add helpful guidance for users with no documents
+                response += "\n\n🚀 **Get Started**: Upload your first document using the drag & drop area above!"
         
         return response
 
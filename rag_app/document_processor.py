@@ -8,6 +8,7 @@ import mimetypes
 from typing import Dict, List, Optional, Tuple
 from pathlib import Path
 import time
+import numpy as np
 
 # Document processing imports
 import PyPDF2
@@ -17,10 +18,11 @@ from io import StringIO
 
 from django.core.files.uploadedfile import UploadedFile
 from django.conf import settings
+from django.db import transaction
 from django.utils import timezone
 
 from .models import Document, DocumentChunk, Embedding
-from .embedding_utils import get_embedding_generator, chunk_text, calculate_content_hash, estimate_tokens
+from .embedding_utils import get_embedding_generator, chunk_text, calculate_content_hash, calculate_chunk_hash
 
 
 class DocumentProcessor:
@@ -294,12 +296,14 @@ class DocumentProcessor:
             content_hash = calculate_content_hash(content)
             
             # Check for duplicate content
-            existing_doc = Document.objects.filter(content_hash=content_hash).first()
+            existing_doc = Document.objects.filter(
+                content_hash=content_hash
+            ).select_related('uploaded_by').only(
+                'title', 'uploaded_at', 'uploaded_by__username'
+            ).first()
             if existing_doc:
                 # Delete the newly uploaded file since it's a duplicate
-                full_path = Path(settings.MEDIA_ROOT) / file_path
-                if full_path.exists():
-                    full_path.unlink()
+                (Path(settings.MEDIA_ROOT) / file_path).unlink(missing_ok=True)
                 
                 raise ValueError(
                     f"Document with identical content already exists: '{existing_doc.title}' "
@@ -328,11 +332,110 @@ class DocumentProcessor:
             
         except Exception as e:
             # Clean up uploaded file on error
-            full_path = Path(settings.MEDIA_ROOT) / file_path
-            if full_path.exists():
-                full_path.unlink()
+            (Path(settings.MEDIA_ROOT) / file_path).unlink(missing_ok=True)
             raise e
     
+    def _chunk_document(self, document: Document) -> List[Dict]:
+        """Split a document's content into chunk dicts"""
+        # Get chunking parameters from environment or use defaults
+        chunk_size = int(os.getenv('CHUNK_SIZE', 500))
+        overlap = int(os.getenv('CHUNK_OVERLAP', 50))
+        
+        print(f"Creating chunks for document '{document.title}'...")
+        chunks_data = chunk_text(document.content, chunk_size=chunk_size, overlap=overlap)
+        
+        if not chunks_data:
+            raise ValueError("No chunks could be created from document content")
+        for chunk in chunks_data:
+            chunk['content_hash'] = calculate_chunk_hash(chunk['content'])
+        return chunks_data
+    
+    def _embed_chunks(self, chunks_data: List[Dict], embedding_gen) -> Tuple[np.ndarray, float]:
+        """
+        Embed chunk dicts and set their 'token_count', reusing the stored
+        vector and count of any chunk whose content hash already has an
+        embedding from the same model
+        
+        Returns:
+            tuple: (embeddings_array, processing time of the chunks actually embedded)
+        """
+        hashes = [chunk['content_hash'] for chunk in chunks_data]
+        known = Embedding.objects.by_chunk_hash(hashes, embedding_gen.model_name)
+        
+        # Each unseen text is embedded once, even if it repeats in this batch
+        missing = {
+            content_hash: chunk['content']
+            for content_hash, chunk in zip(hashes, chunks_data)
+            if content_hash not in known
+        }
+        embedding_time = 0.0
+        if missing:
+            print(f"Generating embeddings for {len(missing)} of {len(hashes)} chunks...")
+            # One tokenization gives both the embeddings and exact token counts
+            embeddings, token_counts, embedding_time = embedding_gen.generate_embeddings_with_token_counts(
+                list(missing.values())
+            )
+            known.update(zip(missing, zip(embeddings, token_counts.tolist())))
+        else:
+            print(f"Reusing stored embeddings for all {len(hashes)} chunks")
+        
+        for chunk, content_hash in zip(chunks_data, hashes):
+            chunk['token_count'] = known[content_hash][1]
+        return np.stack([known[content_hash][0] for content_hash in hashes]), embedding_time
+    
+    def _save_chunks(
+        self,
+        document: Document,
+        chunks_data: List[Dict],
+        embeddings: np.ndarray,
+        embedding_time: float,
+        model_name: str,
+    ) -> None:
+        """Store a document's chunks and embeddings and mark it processed"""
+        # Create DocumentChunk and Embedding objects
+        created_chunks = [
+            DocumentChunk(
+                document=document,
+                content=chunk_data['content'],
+                chunk_index=chunk_data['chunk_index'],
+                start_char=chunk_data['start_char'],
+                end_char=chunk_data['end_char'],
+                word_count=chunk_data['word_count'],
+                char_count=chunk_data['char_count'],
+                token_count=chunk_data['token_count'],
+                display_header=DocumentChunk.format_header(document.title),
+                content_hash=chunk_data['content_hash'],
+            )
+            for chunk_data in chunks_data
+        ]
+        
+        with transaction.atomic():
+            DocumentChunk.objects.bulk_create(created_chunks)
+            
+            # Stream all embeddings in one COPY (chunk ids are assigned client-side)
+            Embedding.copy_from(
+                zip((chunk.id for chunk in created_chunks), embeddings),
+                model_name=model_name,
+                processing_time=embedding_time / len(created_chunks)  # Average time per chunk
+            )
+        
+        # Update document
+        document.chunk_count = len(created_chunks)
+        document.status = 'processed'
+        document.processed_at = timezone.now()
+        # Don't rewrite the (possibly multi-MB) content column just to flip the status
+        document.save(update_fields=['chunk_count', 'status', 'processed_at'])
+        
+        print(f"Created {len(created_chunks)} chunks with embeddings for '{document.title}'")
+    
+    def _mark_failed(self, document: Document, error: Exception) -> None:
+        """Record a processing failure on the document"""
+        document.status = 'failed'
+        document.processing_error = str(error)
+        document.save(update_fields=['status', 'processing_error'])
+        
+        print(f"Document processing failed: {str(error)}")
+    
     def create_chunks_and_embeddings(self, document: Document) -> None:
         """
         Create text chunks and generate embeddings for a document
@@ -341,71 +444,78 @@ class DocumentProcessor:
             raise ValueError(f"Document status must be 'processing', got '{document.status}'")
         
         try:
-            # Get chunking parameters from environment or use defaults
-            chunk_size = int(os.getenv('CHUNK_SIZE', 500))
-            overlap = int(os.getenv('CHUNK_OVERLAP', 50))
-            
-            print(f"Creating chunks for document '{document.title}'...")
             start_time = time.time()
-            
-            # Create chunks
-            chunks_data = chunk_text(document.content, chunk_size=chunk_size, overlap=overlap)
-            
-            if not chunks_data:
-                raise ValueError("No chunks could be created from document content")
+            chunks_data = self._chunk_document(document)
             
             # Get embedding generator
             embedding_gen = get_embedding_generator()
+            embeddings, total_embedding_time = self._embed_chunks(chunks_data, embedding_gen)
             
-            # Prepare texts for batch embedding
-            chunk_texts = [chunk['content'] for chunk in chunks_data]
+            self._save_chunks(document, chunks_data, embeddings, total_embedding_time, embedding_gen.model_name)
             
-            print(f"Generating embeddings for {len(chunk_texts)} chunks...")
-            embeddings, total_embedding_time = embedding_gen.generate_embeddings_batch(chunk_texts)
-            
-            # Create DocumentChunk and Embedding objects
-            created_chunks = []
-            for i, chunk_data in enumerate(chunks_data):
-                # Create chunk
-                doc_chunk = DocumentChunk.objects.create(
-                    document=document,
-                    content=chunk_data['content'],
-                    chunk_index=chunk_data['chunk_index'],
-                    start_char=chunk_data['start_char'],
-                    end_char=chunk_data['end_char'],
-                    word_count=chunk_data['word_count'],
-                    char_count=chunk_data['char_count'],
-                    token_count=estimate_tokens(chunk_data['content'])
-                )
-                
-                # Create embedding
-                Embedding.objects.create(
-                    chunk=doc_chunk,
-                    vector=embeddings[i].tolist(),  # Convert numpy array to list
-                    model_name=embedding_gen.model_name,
-                    processing_time=total_embedding_time / len(chunk_texts)  # Average time per chunk
-                )
-                
-                created_chunks.append(doc_chunk)
-            
-            # Update document
             processing_time = time.time() - start_time
-            document.chunk_count = len(created_chunks)
-            document.status = 'processed'
-            document.processed_at = timezone.now()
-            document.save()
-            
             print(f"Document processing completed in {processing_time:.2f} seconds")
-            print(f"Created {len(created_chunks)} chunks with embeddings")
             
         except Exception as e:
-            # Update document status to failed
-            document.status = 'failed'
-            document.processing_error = str(e)
-            document.save()
-            
-            print(f"Document processing failed: {str(e)}")
+            self._mark_failed(document, e)
             raise e
+    
+    def create_chunks_and_embeddings_bulk(self, documents: List[Document]) -> None:
+        """
+        Create chunks for several documents and embed them all in one
+        encode() call, so the model runs on full batches instead of one
+        document's (often short) chunk list at a time
+        
+        Documents that fail are marked failed without affecting the rest.
+        """
+        start_time = time.time()
+        
+        # Chunk everything first; a document that can't be chunked fails alone
+        chunked = []
+        for document in documents:
+            if document.status != 'processing':
+                print(f"Skipping '{document.title}': status must be 'processing', got '{document.status}'")
+                continue
+            try:
+                chunked.append((document, self._chunk_document(document)))
+            except Exception as e:
+                self._mark_failed(document, e)
+        
+        if not chunked:
+            return
+        
+        embedding_gen = get_embedding_generator()
+        all_chunks = [chunk for _, chunks_data in chunked for chunk in chunks_data]
+        
+        print(f"Embedding {len(all_chunks)} chunks across {len(chunked)} documents...")
+        try:
+            embeddings, total_embedding_time = self._embed_chunks(all_chunks, embedding_gen)
+        except Exception as e:
+            # e.g. out of memory on a very large batch: embed document by document
+            print(f"Batched embedding failed ({e}), falling back to per-document processing")
+            for document, _ in chunked:
+                try:
+                    self.create_chunks_and_embeddings(document)
+                except Exception:
+                    pass  # already marked failed
+            return
+        
+        # Hand each document its slice of the embedding matrix
+        time_per_chunk = total_embedding_time / len(all_chunks)
+        offset = 0
+        for document, chunks_data in chunked:
+            count = len(chunks_data)
+            try:
+                self._save_chunks(
+                    document, chunks_data, embeddings[offset:offset + count],
+                    time_per_chunk * count, embedding_gen.model_name,
+                )
+            except Exception as e:
+                self._mark_failed(document, e)
+            offset += count
+        
+        processing_time = time.time() - start_time
+        print(f"Processed {len(chunked)} documents in {processing_time:.2f} seconds")
 
 
 # Global document processor instance
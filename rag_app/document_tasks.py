@@ -0,0 +1,58 @@
+"""
+Background chunking and embedding for uploaded documents, and cleanup of
+their stored files
+
+Uploads and reprocess requests queue document ids on one shared, bounded
+thread pool instead of starting a thread per request. Embedding inference
+dominates the work and the model is shared, so extra threads would only
+contend for it.
+"""
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterable, List
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from .document_processor import get_document_processor
+from .models import Document
+
+logger = logging.getLogger(__name__)
+
+_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'DOCUMENT_PROCESSING_WORKERS', 1),
+    thread_name_prefix='document-processing',
+)
+
+
+def _process_documents(document_ids: List) -> None:
+    """Chunk and embed a batch of documents on a pool thread"""
+    close_old_connections()
+    try:
+        documents = list(Document.objects.filter(pk__in=document_ids))
+        # One encode() over every document's chunks keeps the model's batches full
+        get_document_processor().create_chunks_and_embeddings_bulk(documents)
+        logger.info(f"Background processing completed for {len(documents)} document(s)")
+    except Exception as e:
+        logger.error(f"Background processing failed for documents {document_ids}: {e}")
+    finally:
+        close_old_connections()
+
+
+def submit_documents(documents: Iterable[Document]) -> Future:
+    """Queue documents for chunking and embedding as one batch; returns immediately"""
+    return _executor.submit(_process_documents, [document.pk for document in documents])
+
+
+def _remove_file(path: str) -> None:
+    """Delete a stored upload, tolerating one that's already gone"""
+    try:
+        Path(path).unlink(missing_ok=True)
+    except OSError as e:
+        logger.warning(f"Could not remove file {path}: {e}")
+
+
+def submit_file_removal(path: str) -> Future:
+    """Queue a stored upload for deletion; returns immediately"""
+    return _executor.submit(_remove_file, path)
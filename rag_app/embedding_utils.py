@@ -3,9 +3,12 @@ Embedding utilities for RAG system using sentence-transformers
 """
 import time
 import hashlib
+from functools import lru_cache
 from typing import List, Optional
 import numpy as np
+import torch
 from sentence_transformers import SentenceTransformer
+from sentence_transformers.util import batch_to_device
 from django.conf import settings
 import os
 
@@ -25,7 +28,7 @@ class EmbeddingGenerator:
         try:
             print(f"Loading embedding model: {self.model_name}")
             start_time = time.time()
-            self.model = SentenceTransformer(self.model_name)
+            self.model = get_sentence_transformer(self.model_name)
             load_time = time.time() - start_time
             print(f"Model loaded in {load_time:.2f} seconds")
         except Exception as e:
@@ -43,7 +46,8 @@ class EmbeddingGenerator:
             raise ValueError("Model not loaded")
         
         start_time = time.time()
-        embedding = self.model.encode(text, convert_to_numpy=True)
+        # Unit length, so stored vectors can be compared by inner product
+        embedding = self.model.encode(text, convert_to_numpy=True, normalize_embeddings=True)
         processing_time = time.time() - start_time
         
         return embedding, processing_time
@@ -59,18 +63,63 @@ class EmbeddingGenerator:
             raise ValueError("Model not loaded")
         
         start_time = time.time()
-        embeddings = self.model.encode(texts, convert_to_numpy=True, show_progress_bar=True)
+        embeddings = self.model.encode(
+            texts, convert_to_numpy=True, normalize_embeddings=True, show_progress_bar=True
+        )
         processing_time = time.time() - start_time
         
         return embeddings, processing_time
     
+    def generate_embeddings_with_token_counts(
+        self, texts: List[str], batch_size: int = 32
+    ) -> tuple[np.ndarray, np.ndarray, float]:
+        """
+        Generate embeddings for multiple texts and count their tokens from a
+        single tokenization
+        
+        encode() tokenizes internally and throws the result away; here each
+        length-sorted batch is tokenized once, its attention mask gives the
+        token counts and the same tensors go through the forward pass.
+        Counts are the tokens the model saw: special tokens included, capped
+        at the model's max_seq_length.
+        
+        Returns:
+            tuple: (embeddings_array, token_counts, total_processing_time)
+        """
+        if not self.model:
+            raise ValueError("Model not loaded")
+        
+        start_time = time.time()
+        embeddings = np.empty((len(texts), self.model.get_sentence_embedding_dimension()), dtype=np.float32)
+        token_counts = np.empty(len(texts), dtype=np.int64)
+        
+        # Longest first, like encode(), so each batch pads to similar lengths
+        order = np.argsort([-len(text) for text in texts], kind='stable')
+        with torch.inference_mode():
+            for start in range(0, len(texts), batch_size):
+                batch = order[start:start + batch_size]
+                features = self.model.tokenize([texts[i] for i in batch])
+                token_counts[batch] = features['attention_mask'].sum(dim=1).numpy()
+                
+                output = self.model(batch_to_device(features, self.model.device))
+                # Unit length, same as normalize_embeddings=True in encode()
+                vectors = torch.nn.functional.normalize(output['sentence_embedding'], p=2, dim=1)
+                embeddings[batch] = vectors.float().cpu().numpy()
+        processing_time = time.time() - start_time
+        
+        return embeddings, token_counts, processing_time
+    
     def get_similarity(self, embedding1: np.ndarray, embedding2: np.ndarray) -> float:
         """
         Calculate cosine similarity between two embeddings
+        
+        Embeddings from this generator are unit length, so for those the
+        plain dot product is already the cosine similarity.
         """
-        return np.dot(embedding1, embedding2) / (
-            np.linalg.norm(embedding1) * np.linalg.norm(embedding2)
-        )
+        # One sqrt for both norms instead of two
+        return float(np.dot(embedding1, embedding2) / np.sqrt(
+            np.vdot(embedding1, embedding1) * np.vdot(embedding2, embedding2)
+        ))
 
 
 def chunk_text(text: str, chunk_size: int = 500, overlap: int = 50) -> List[dict]:
@@ -138,11 +187,31 @@ def chunk_text(text: str, chunk_size: int = 500, overlap: int = 50) -> List[dict
     return chunks
 
 
-def calculate_content_hash(content: str) -> str:
+# Characters encoded per hash update, bounds the temporary bytes copy
+HASH_BLOCK_CHARS = 1024 * 1024
+
+
+def calculate_content_hash(content: str) -> bytes:
+    """
+    Calculate the raw SHA256 digest of content for deduplication
+    
+    hashlib is OpenSSL-backed (SHA-NI where available); the content is
+    encoded in blocks so large documents aren't copied to bytes in one go.
+    """
+    digest = hashlib.sha256()
+    for start in range(0, len(content), HASH_BLOCK_CHARS):
+        digest.update(content[start:start + HASH_BLOCK_CHARS].encode('utf-8'))
+    return digest.digest()
+
+
+def calculate_chunk_hash(content: str) -> bytes:
     """
-    Calculate SHA256 hash of content for deduplication
+    Calculate a 16-byte BLAKE2b digest of a chunk's content
+    
+    Chunks are small and hashed in bulk, so this trades SHA256 for the
+    faster BLAKE2b; the digest only needs to identify identical chunks.
     """
-    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+    return hashlib.blake2b(content.encode('utf-8'), digest_size=16).digest()
 
 
 def estimate_tokens(text: str) -> int:
@@ -152,6 +221,19 @@ def estimate_tokens(text: str) -> int:
     return len(text) // 4
 
 
+@lru_cache(maxsize=4)
+def get_sentence_transformer(model_name: str) -> SentenceTransformer:
+    """
+    Load a sentence-transformers model once per process; ingestion and the
+    query engine share the same weights
+    """
+    model = SentenceTransformer(model_name, device=getattr(settings, 'EMBEDDING_DEVICE', None))
+    # One throwaway encode pays the lazy first-call setup (tokenizer, kernels)
+    # here rather than inside the first timed query or ingestion
+    model.encode(['warmup'], convert_to_numpy=True)
+    return model
+
+
 # Global embedding generator instance
 _embedding_generator = None
 
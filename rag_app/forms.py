@@ -118,10 +118,11 @@ class QueryForm(forms.Form):
         super().__init__(*args, **kwargs)
         
         if user and user.is_authenticated:
+            # Choice labels use Document.__str__ (title and file name); skip the content column
             self.fields['document_filter'].queryset = Document.objects.filter(
                 uploaded_by=user,
                 status='processed'
-            ).order_by('title')
+            ).only('id', 'title', 'file_name').order_by('title')
 
 
 class DocumentSearchForm(forms.Form):
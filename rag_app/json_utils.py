@@ -0,0 +1,30 @@
+"""
+Compact JSON encoding for API responses
+
+orjson is optional; without it the stdlib encoder produces the same output.
+"""
+import json
+from typing import Any
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps_json(data: Any) -> bytes:
+    """Serialize to compact JSON bytes (orjson when available)"""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(data, cls=DjangoJSONEncoder, separators=(',', ':')).encode('utf-8')
+
+
+class OrjsonResponse(HttpResponse):
+    """JsonResponse counterpart that encodes with dumps_json()"""
+    
+    def __init__(self, data: Any, **kwargs):
+        kwargs.setdefault('content_type', 'application/json')
+        super().__init__(dumps_json(data), **kwargs)
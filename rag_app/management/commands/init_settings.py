@@ -20,6 +20,13 @@ class Command(BaseCommand):
             'rag_temperature': '0.7',
             'rag_max_tokens': '1000',
             'rag_include_metadata': 'true',
+            'rag_vector_index_type': 'hnsw',
+            'rag_hnsw_ef_search': '100',
+            'rag_ivfflat_lists': 'auto',  # sized from the row count by rebuild_vector_index
+            'rag_ivfflat_probes': '10',
+            'rag_history_retention_days': '365',
+            'rag_semantic_cache_threshold': '0.97',
+            'rag_binary_rerank_factor': '0',
             'embeddings_model': os.getenv('EMBEDDINGS_MODEL', 'all-mpnet-base-v2'),
             'chunk_size': os.getenv('CHUNK_SIZE', '1000'),
             'chunk_overlap': os.getenv('CHUNK_OVERLAP', '100'),
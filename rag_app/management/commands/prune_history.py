@@ -0,0 +1,79 @@
+"""
+Management command to delete query logs and conversation history older than
+the retention window, in small batches
+"""
+
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from rag_app.models import ConversationHistory, QueryLog, SystemSettings
+
+
+DEFAULT_RETENTION_DAYS = 365
+
+
+class Command(BaseCommand):
+    help = 'Delete QueryLog and ConversationHistory rows older than the retention window'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            help=f'Retention window in days (defaults to the rag_history_retention_days setting, '
+                 f'or {DEFAULT_RETENTION_DAYS})',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Rows deleted per transaction (default: 5000)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only count the rows that would be deleted',
+        )
+
+    def handle(self, *args, **options):
+        """Prune old history rows"""
+        days = options.get('days')
+        if days is None:
+            setting = SystemSettings.objects.filter(key='rag_history_retention_days').first()
+            days = int(setting.value) if setting else DEFAULT_RETENTION_DAYS
+        if days < 1:
+            raise CommandError('Retention window must be at least 1 day')
+        if options['batch_size'] < 1:
+            raise CommandError('Batch size must be at least 1')
+
+        cutoff = timezone.now() - timedelta(days=days)
+        self.stdout.write(f"🗑️  Pruning history older than {cutoff:%Y-%m-%d %H:%M} ({days} days)")
+
+        for model in (QueryLog, ConversationHistory):
+            old_rows = model.objects.filter(created_at__lt=cutoff)
+
+            if options['dry_run']:
+                self.stdout.write(f"   {model.__name__}: {old_rows.count()} rows would be deleted")
+                continue
+
+            deleted = self._delete_in_batches(old_rows, options['batch_size'])
+            self.stdout.write(f"   {model.__name__}: {deleted} rows deleted")
+
+        if not options['dry_run']:
+            self.stdout.write(self.style.SUCCESS("✅ History pruned"))
+
+    def _delete_in_batches(self, queryset, batch_size):
+        """
+        Delete a queryset a batch of primary keys at a time so each transaction
+        (and the dead tuples autovacuum has to clean up) stays small
+        """
+        total = 0
+        while True:
+            with transaction.atomic():
+                ids = list(queryset.order_by('created_at').values_list('id', flat=True)[:batch_size])
+                if not ids:
+                    return total
+                # Counts the M2M link rows too; only the model rows are reported
+                _, per_model = queryset.model.objects.filter(id__in=ids).delete()
+                total += per_model.get(queryset.model._meta.label, 0)
@@ -0,0 +1,126 @@
+"""
+Management command to rebuild the embedding vector index with parameters
+sized to the current number of embeddings
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from rag_app.models import Embedding, SystemSettings
+
+
+# Name is kept the same for both index types so migrations can still find it.
+# The model's Meta declares it as an HnswIndex, so after an IVFFlat rebuild the
+# database no longer matches migration state; rebuild with hnsw before running
+# migrations that alter this index.
+INDEX_NAME = 'rag_app_emb_vector_hnsw'
+INDEX_TYPES = ['hnsw', 'ivfflat']
+
+
+def configure_hnsw_params(vector_count):
+    """
+    Pick HNSW (m, ef_construction, ef_search) for a given number of vectors.
+    Small tables don't need a dense graph; large ones need it for recall.
+    """
+    if vector_count < 100_000:
+        return 16, 64, 40
+    elif vector_count < 1_000_000:
+        return 24, 100, 100
+    else:
+        return 32, 128, 200
+
+
+def configure_ivfflat_lists(vector_count):
+    """
+    Pick the IVFFlat list count: rows/1000 up to 1M rows, sqrt(rows) beyond
+    """
+    if vector_count < 1_000_000:
+        return max(vector_count // 1000, 10)
+    return int(vector_count ** 0.5)
+
+
+def _get_setting(key, default):
+    """Read a SystemSettings value, falling back to a default"""
+    setting = SystemSettings.objects.filter(key=key).first()
+    return setting.value if setting else default
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuild the vector index on Embedding.vector with size-appropriate parameters. '
+        f'Both index types are built as {INDEX_NAME}, which migrations declare as HNSW: '
+        'after an IVFFlat rebuild, rebuild with hnsw before migrating that index.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--index-type',
+            choices=INDEX_TYPES,
+            help='Index type to build (defaults to the rag_vector_index_type setting)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Show the chosen parameters without rebuilding the index',
+        )
+
+    def handle(self, *args, **options):
+        """Rebuild the vector index"""
+        index_type = options.get('index_type') or _get_setting('rag_vector_index_type', 'hnsw')
+        if index_type not in INDEX_TYPES:
+            raise CommandError(f"Unknown index type '{index_type}', expected one of {INDEX_TYPES}")
+
+        vector_count = Embedding.objects.count()
+        self.stdout.write(f"📊 Embeddings: {vector_count}")
+
+        # Settings the query path reads to SET LOCAL on every search
+        query_settings = {'rag_vector_index_type': index_type}
+
+        if index_type == 'ivfflat':
+            # 'auto' (or empty) sizes the list count from the row count
+            lists_setting = _get_setting('rag_ivfflat_lists', 'auto').strip()
+            if lists_setting.lower() in ('', 'auto'):
+                lists = configure_ivfflat_lists(vector_count)
+            else:
+                lists = int(lists_setting)
+            using = f'ivfflat (vector halfvec_ip_ops) WITH (lists = {lists:d})'
+            self.stdout.write(f"🔧 IVFFlat parameters: lists={lists}")
+        else:
+            m, ef_construction, ef_search = configure_hnsw_params(vector_count)
+            using = f'hnsw (vector halfvec_ip_ops) WITH (m = {m:d}, ef_construction = {ef_construction:d})'
+            query_settings['rag_hnsw_ef_search'] = ef_search
+            self.stdout.write(f"🔧 HNSW parameters: m={m}, ef_construction={ef_construction}, ef_search={ef_search}")
+
+        if options['dry_run']:
+            return
+
+        table = Embedding._meta.db_table
+        new_index_name = f'{INDEX_NAME}_new'
+        # CONCURRENTLY can't run in a transaction: each statement autocommits,
+        # and searches and ingestion keep running while the new index builds
+        with connection.cursor() as cursor:
+            # Session settings, since SET LOCAL needs a transaction
+            cursor.execute("SET maintenance_work_mem = '2GB'")
+            cursor.execute("SET max_parallel_maintenance_workers = 7")
+            try:
+                # Leftover (invalid) index from an interrupted rebuild
+                cursor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS "{new_index_name}"')
+                cursor.execute(f'CREATE INDEX CONCURRENTLY "{new_index_name}" ON "{table}" USING {using}')
+                cursor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS "{INDEX_NAME}"')
+                cursor.execute(f'ALTER INDEX "{new_index_name}" RENAME TO "{INDEX_NAME}"')
+            finally:
+                cursor.execute("RESET maintenance_work_mem")
+                cursor.execute("RESET max_parallel_maintenance_workers")
+
+        with transaction.atomic():
+            for key, value in query_settings.items():
+                SystemSettings.objects.update_or_create(
+                    key=key,
+                    defaults={
+                        'value': str(value),
+                        'value_type': 'integer' if isinstance(value, int) else 'string',
+                    },
+                )
+
+        self.stdout.write(
+            self.style.SUCCESS(f"✅ Rebuilt {index_type} index {INDEX_NAME}")
+        )
@@ -8,6 +8,13 @@ from django.contrib.auth.models import User
 import json
 
 
+# Output separators
+SEP_HEAVY = "=" * 60
+SEP_WIDE = "-" * 60
+SEP_MED = "-" * 50
+SEP_LIGHT = "-" * 30
+
+
 class Command(BaseCommand):
     help = 'Test the RAG API endpoint'
     
@@ -31,11 +38,11 @@ class Command(BaseCommand):
         threshold = options['threshold']
         
         self.stdout.write(self.style.HTTP_INFO("🌐 Testing RAG API Endpoint"))
-        self.stdout.write("="*60)
+        self.stdout.write(SEP_HEAVY)
         
         self.stdout.write(f"❓ Query: {query_text}")
         self.stdout.write(f"🎯 Threshold: {threshold}")
-        self.stdout.write("-"*60)
+        self.stdout.write(SEP_WIDE)
         
         try:
             # Create test client
@@ -61,18 +68,18 @@ class Command(BaseCommand):
             if response.status_code == 200:
                 result = response.json()
                 
-                self.stdout.write("\n" + "="*60)
+                self.stdout.write("\n" + SEP_HEAVY)
                 self.stdout.write(self.style.SUCCESS("✅ API RESPONSE"))
-                self.stdout.write("="*60)
+                self.stdout.write(SEP_HEAVY)
                 
                 self.stdout.write(f"\n💬 Answer:")
-                self.stdout.write("-"*30)
+                self.stdout.write(SEP_LIGHT)
                 self.stdout.write(result.get('response', 'No response'))
                 
                 source_chunks = result.get('source_chunks', [])
                 if source_chunks:
                     self.stdout.write(f"\n📚 Source Chunks ({len(source_chunks)}):")
-                    self.stdout.write("-"*50)
+                    self.stdout.write(SEP_MED)
                     
                     for i, chunk in enumerate(source_chunks, 1):
                         self.stdout.write(f"\n{i}. Document: {chunk.get('document_title', 'Unknown')}")
@@ -81,13 +88,13 @@ class Command(BaseCommand):
                 
                 # Performance metrics
                 self.stdout.write(f"\n⚡ Performance:")
-                self.stdout.write("-"*30)
+                self.stdout.write(SEP_LIGHT)
                 self.stdout.write(f"Search time: {result.get('search_time', 0):.3f}s")
                 self.stdout.write(f"LLM time: {result.get('llm_time', 0):.3f}s")
                 self.stdout.write(f"Total time: {result.get('total_time', 0):.3f}s")
                 self.stdout.write(f"Chunks found: {result.get('total_chunks_found', 0)}")
                 
-                self.stdout.write("\n" + "="*60)
+                self.stdout.write("\n" + SEP_HEAVY)
                 self.stdout.write(
                     self.style.SUCCESS("🎉 API test completed successfully!")
                 )
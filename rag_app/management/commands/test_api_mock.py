@@ -6,9 +6,17 @@ from django.core.management.base import BaseCommand
 from django.test import Client, override_settings
 from django.contrib.auth.models import User
 import json
+import time
 from unittest.mock import patch
 
 
+# Output separators
+SEP_HEAVY = "=" * 60
+SEP_WIDE = "-" * 60
+SEP_MED = "-" * 50
+SEP_LIGHT = "-" * 30
+
+
 class Command(BaseCommand):
     help = 'Test the RAG API endpoint with mock LLM'
     
@@ -26,11 +34,10 @@ class Command(BaseCommand):
             help='Similarity threshold for search',
         )
     
-    async def mock_llm_response(self, prompt):
+    def mock_llm_response(self, prompt):
         """Mock LLM response for testing"""
         # Simulate API delay
-        import asyncio
-        await asyncio.sleep(0.1)
+        time.sleep(0.1)
         
         response = "Based on the provided documents, I found information about meetings with Young and related tasks."
         
@@ -50,15 +57,15 @@ class Command(BaseCommand):
         threshold = options['threshold']
         
         self.stdout.write(self.style.HTTP_INFO("🌐 Testing RAG API with Mock LLM"))
-        self.stdout.write("="*60)
+        self.stdout.write(SEP_HEAVY)
         
         self.stdout.write(f"❓ Query: {query_text}")
         self.stdout.write(f"🎯 Threshold: {threshold}")
-        self.stdout.write("-"*60)
+        self.stdout.write(SEP_WIDE)
         
         try:
             # Mock the LLM response to avoid OpenRouter API
-            with patch('rag_app.rag_engine.RAGQueryEngine.generate_llm_response', self.mock_llm_response):
+            with patch('rag_app.rag_engine.RAGQueryEngine._call_llm', self.mock_llm_response):
                 # Create test client
                 client = Client()
                 
@@ -82,18 +89,18 @@ class Command(BaseCommand):
                 if response.status_code == 200:
                     result = response.json()
                     
-                    self.stdout.write("\n" + "="*60)
+                    self.stdout.write("\n" + SEP_HEAVY)
                     self.stdout.write(self.style.SUCCESS("✅ API RESPONSE"))
-                    self.stdout.write("="*60)
+                    self.stdout.write(SEP_HEAVY)
                     
                     self.stdout.write(f"\n💬 Answer:")
-                    self.stdout.write("-"*30)
+                    self.stdout.write(SEP_LIGHT)
                     self.stdout.write(result.get('response', 'No response'))
                     
                     source_chunks = result.get('source_chunks', [])
                     if source_chunks:
                         self.stdout.write(f"\n📚 Source Chunks ({len(source_chunks)}):")
-                        self.stdout.write("-"*50)
+                        self.stdout.write(SEP_MED)
                         
                         for i, chunk in enumerate(source_chunks, 1):
                             self.stdout.write(f"\n{i}. Document: {chunk.get('document_title', 'Unknown')}")
@@ -102,7 +109,7 @@ class Command(BaseCommand):
                     
                     # Performance metrics
                     self.stdout.write(f"\n⚡ Performance:")
-                    self.stdout.write("-"*30)
+                    self.stdout.write(SEP_LIGHT)
                     self.stdout.write(f"Search time: {result.get('search_time', 0):.3f}s")
                     self.stdout.write(f"LLM time: {result.get('llm_time', 0):.3f}s")
                     self.stdout.write(f"Total time: {result.get('total_time', 0):.3f}s")
@@ -110,13 +117,13 @@ class Command(BaseCommand):
                     
                     if result.get('prompt_tokens', 0) > 0:
                         self.stdout.write(f"\n💰 Token Usage:")
-                        self.stdout.write("-"*30)
+                        self.stdout.write(SEP_LIGHT)
                         self.stdout.write(f"Prompt tokens: {result.get('prompt_tokens', 0)}")
                         self.stdout.write(f"Completion tokens: {result.get('completion_tokens', 0)}")
                         self.stdout.write(f"Total cost: ${result.get('total_cost', 0):.6f}")
                         self.stdout.write(f"Model: {result.get('llm_model', 'Unknown')}")
                     
-                    self.stdout.write("\n" + "="*60)
+                    self.stdout.write("\n" + SEP_HEAVY)
                     self.stdout.write(
                         self.style.SUCCESS("🎉 API test with mock LLM successful!")
                     )
@@ -7,6 +7,12 @@ from django.contrib.auth.models import User
 from rag_app.rag_engine import RAGQueryEngine, quick_query
 
 
+# Output separators
+SEP_HEAVY = "=" * 60
+SEP_WIDE = "-" * 60
+SEP_LIGHT = "-" * 30
+
+
 class Command(BaseCommand):
     help = 'Test the RAG query engine with sample queries'
     
@@ -35,7 +41,7 @@ class Command(BaseCommand):
         detailed = options['detailed']
         
         self.stdout.write(self.style.HTTP_INFO("🚀 Testing RAG Query Engine"))
-        self.stdout.write("="*60)
+        self.stdout.write(SEP_HEAVY)
         
         # Get user if specified
         user = None
@@ -55,7 +61,7 @@ class Command(BaseCommand):
                 self.stdout.write(f"👤 Using user: {user.username}")
         
         self.stdout.write(f"❓ Query: {query_text}")
-        self.stdout.write("-"*60)
+        self.stdout.write(SEP_WIDE)
         
         try:
             # Initialize RAG engine
@@ -67,17 +73,17 @@ class Command(BaseCommand):
             response = engine.query(query_text, user=user)
             
             # Display results
-            self.stdout.write("\n" + "="*60)
+            self.stdout.write("\n" + SEP_HEAVY)
             self.stdout.write(self.style.SUCCESS("✅ RAG RESPONSE"))
-            self.stdout.write("="*60)
+            self.stdout.write(SEP_HEAVY)
             
             self.stdout.write(f"\n📝 Answer:")
-            self.stdout.write("-"*30)
+            self.stdout.write(SEP_LIGHT)
             self.stdout.write(response.response)
             
             if response.source_chunks:
                 self.stdout.write(f"\n📚 Source Chunks ({len(response.source_chunks)}):")
-                self.stdout.write("-"*30)
+                self.stdout.write(SEP_LIGHT)
                 
                 for i, chunk_result in enumerate(response.source_chunks, 1):
                     chunk = chunk_result.chunk
@@ -94,7 +100,7 @@ class Command(BaseCommand):
             
             # Performance metrics
             self.stdout.write(f"\n⚡ Performance Metrics:")
-            self.stdout.write("-"*30)
+            self.stdout.write(SEP_LIGHT)
             self.stdout.write(f"Search time: {response.search_time:.3f}s")
             self.stdout.write(f"LLM time: {response.llm_time:.3f}s")
             self.stdout.write(f"Total time: {response.total_time:.3f}s")
@@ -102,13 +108,13 @@ class Command(BaseCommand):
             
             if detailed:
                 self.stdout.write(f"\n💰 Token Usage:")
-                self.stdout.write("-"*30)
+                self.stdout.write(SEP_LIGHT)
                 self.stdout.write(f"Prompt tokens: {response.prompt_tokens}")
                 self.stdout.write(f"Completion tokens: {response.completion_tokens}")
                 self.stdout.write(f"Total cost: ${response.total_cost:.6f}")
                 self.stdout.write(f"LLM model: {response.llm_model}")
             
-            self.stdout.write("\n" + "="*60)
+            self.stdout.write("\n" + SEP_HEAVY)
             self.stdout.write(
                 self.style.SUCCESS("🎉 RAG query test completed successfully!")
             )
@@ -122,7 +128,7 @@ class Command(BaseCommand):
                 self.stdout.write(traceback.format_exc())
         
         # Test quick_query function
-        self.stdout.write("\n" + "="*60)
+        self.stdout.write("\n" + SEP_HEAVY)
         self.stdout.write("🚀 Testing quick_query function...")
         
         try:
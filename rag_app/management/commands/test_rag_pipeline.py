@@ -4,17 +4,44 @@ Management command to test the complete RAG pipeline with a mock LLM response
 
 from django.core.management.base import BaseCommand
 from django.contrib.auth.models import User
+from django.db import connection
+from django.db.models import Count
 from rag_app.rag_engine import RAGQueryEngine
+from rag_app.models import QueryLog
+from rag_app.query_log_writer import flush_query_logs
+from concurrent.futures import ThreadPoolExecutor
 from decimal import Decimal
 import time
 
 
+# Output separators
+SEP_HEAVY = "=" * 60
+SEP_WIDE = "-" * 60
+SEP_MED = "-" * 50
+SEP_LIGHT = "-" * 30
+
+
+def _fetch_latest_log(query_text):
+    """Fetch the most recent log entry for a query (runs in a worker thread)"""
+    try:
+        # Logs are written by a background thread; wait for this one to land
+        flush_query_logs()
+        return QueryLog.objects.filter(
+            query_text=query_text
+        ).order_by('-created_at').annotate(
+            source_chunk_count=Count('source_chunks')
+        ).values('id', 'source_chunk_count').first()
+    finally:
+        # Worker threads get their own connection; don't leak it
+        connection.close()
+
+
 class MockRAGEngine(RAGQueryEngine):
     """RAG Engine with mock LLM for testing"""
     
-    async def generate_llm_response(self, prompt: str):
+    def _call_llm(self, prompt: str):
         """Mock LLM response for testing"""
-        await self._simulate_delay()
+        self._simulate_delay()
         
         # Analyze the prompt to generate a relevant mock response
         context_lines = prompt.split('\n')
@@ -56,10 +83,9 @@ class MockRAGEngine(RAGQueryEngine):
         
         return response, metadata
     
-    async def _simulate_delay(self):
+    def _simulate_delay(self):
         """Simulate LLM response delay"""
-        import asyncio
-        await asyncio.sleep(0.5)  # 500ms delay
+        time.sleep(0.5)  # 500ms delay
 
 
 class Command(BaseCommand):
@@ -91,7 +117,7 @@ class Command(BaseCommand):
         threshold = options['threshold']
         
         self.stdout.write(self.style.HTTP_INFO("🚀 Testing Complete RAG Pipeline"))
-        self.stdout.write("="*60)
+        self.stdout.write(SEP_HEAVY)
         
         # Get user if specified
         user = None
@@ -112,7 +138,7 @@ class Command(BaseCommand):
         
         self.stdout.write(f"❓ Query: {query_text}")
         self.stdout.write(f"🎯 Similarity threshold: {threshold}")
-        self.stdout.write("-"*60)
+        self.stdout.write(SEP_WIDE)
         
         try:
             # Initialize mock RAG engine
@@ -124,54 +150,56 @@ class Command(BaseCommand):
             self.stdout.write("🔍 Processing complete RAG query...")
             response = engine.query(query_text, user=user)
             
-            # Display results
-            self.stdout.write("\n" + "="*60)
-            self.stdout.write(self.style.SUCCESS("✅ RAG RESPONSE"))
-            self.stdout.write("="*60)
-            
-            self.stdout.write(f"\n💬 Answer:")
-            self.stdout.write("-"*30)
-            self.stdout.write(response.response)
-            
-            if response.source_chunks:
-                self.stdout.write(f"\n📚 Source Chunks ({len(response.source_chunks)}):")
-                self.stdout.write("-"*50)
+            # Look up the query log in the background while the results print
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                log_future = executor.submit(_fetch_latest_log, query_text)
+                
+                # Display results
+                self.stdout.write("\n" + SEP_HEAVY)
+                self.stdout.write(self.style.SUCCESS("✅ RAG RESPONSE"))
+                self.stdout.write(SEP_HEAVY)
                 
-                for i, chunk_result in enumerate(response.source_chunks, 1):
-                    chunk = chunk_result.chunk
-                    similarity = chunk_result.similarity_score
+                self.stdout.write(f"\n💬 Answer:")
+                self.stdout.write(SEP_LIGHT)
+                self.stdout.write(response.response)
+                
+                if response.source_chunks:
+                    self.stdout.write(f"\n📚 Source Chunks ({len(response.source_chunks)}):")
+                    self.stdout.write(SEP_MED)
                     
-                    self.stdout.write(f"\n{i}. Document: {chunk.document.title}")
-                    self.stdout.write(f"   File: {chunk.document.file_name}")
-                    self.stdout.write(f"   Similarity: {similarity:.3f}")
-                    self.stdout.write(f"   Content: {chunk.content[:200]}...")
-            else:
-                self.stdout.write("\n📚 No relevant source chunks found")
-            
-            # Performance metrics
-            self.stdout.write(f"\n⚡ Performance Metrics:")
-            self.stdout.write("-"*30)
-            self.stdout.write(f"Search time: {response.search_time:.3f}s")
-            self.stdout.write(f"LLM time: {response.llm_time:.3f}s")
-            self.stdout.write(f"Total time: {response.total_time:.3f}s")
-            self.stdout.write(f"Chunks found: {response.total_chunks_found}")
-            
-            self.stdout.write(f"\n💰 Token Usage:")
-            self.stdout.write("-"*30)
-            self.stdout.write(f"Prompt tokens: {response.prompt_tokens}")
-            self.stdout.write(f"Completion tokens: {response.completion_tokens}")
-            self.stdout.write(f"Total cost: ${response.total_cost:.6f}")
-            self.stdout.write(f"LLM model: {response.llm_model}")
-            
-            # Check if query was logged
-            from rag_app.models import QueryLog
-            recent_logs = QueryLog.objects.filter(query_text=query_text).order_by('-created_at')[:1]
-            if recent_logs:
-                log = recent_logs[0]
-                self.stdout.write(f"\n📝 Query logged with ID: {log.id}")
-                self.stdout.write(f"   Source chunks logged: {log.source_chunks.count()}")
+                    for i, chunk_result in enumerate(response.source_chunks, 1):
+                        chunk = chunk_result.chunk
+                        similarity = chunk_result.similarity_score
+                        
+                        self.stdout.write(f"\n{i}. Document: {chunk.document.title}")
+                        self.stdout.write(f"   File: {chunk.document.file_name}")
+                        self.stdout.write(f"   Similarity: {similarity:.3f}")
+                        self.stdout.write(f"   Content: {chunk.content[:200]}...")
+                else:
+                    self.stdout.write("\n📚 No relevant source chunks found")
+                
+                # Performance metrics
+                self.stdout.write(f"\n⚡ Performance Metrics:")
+                self.stdout.write(SEP_LIGHT)
+                self.stdout.write(f"Search time: {response.search_time:.3f}s")
+                self.stdout.write(f"LLM time: {response.llm_time:.3f}s")
+                self.stdout.write(f"Total time: {response.total_time:.3f}s")
+                self.stdout.write(f"Chunks found: {response.total_chunks_found}")
+                
+                self.stdout.write(f"\n💰 Token Usage:")
+                self.stdout.write(SEP_LIGHT)
+                self.stdout.write(f"Prompt tokens: {response.prompt_tokens}")
+                self.stdout.write(f"Completion tokens: {response.completion_tokens}")
+                self.stdout.write(f"Total cost: ${response.total_cost:.6f}")
+                self.stdout.write(f"LLM model: {response.llm_model}")
+                
+                # Check if query was logged
+                log = log_future.result()
+            if log:
+                self.stdout.write(f"\n📝 Query logged with ID: {log['id']}")
+                self.stdout.write(f"   Source chunks logged: {log['source_chunk_count']}")
             
-            self.stdout.write("\n" + "="*60)
+            self.stdout.write("\n" + SEP_HEAVY)
             self.stdout.write(
                 self.style.SUCCESS("🎉 Complete RAG pipeline test successful!")
             )
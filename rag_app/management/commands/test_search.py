@@ -6,6 +6,18 @@ from django.core.management.base import BaseCommand
 from django.contrib.auth.models import User
 from rag_app.rag_engine import RAGQueryEngine
 from rag_app.models import DocumentChunk
+from pathlib import Path
+import hashlib
+import numpy as np
+
+
+# Output separators
+SEP_HEAVY = "=" * 60
+SEP_WIDE = "-" * 60
+
+
+# On-disk cache for query embeddings between runs of this command
+EMBEDDING_CACHE_DIR = Path.home() / '.cache' / 'rag_app' / 'emb'
 
 
 class Command(BaseCommand):
@@ -23,14 +35,41 @@ class Command(BaseCommand):
             type=int,
             help='User ID to use for the query (optional)',
         )
+        parser.add_argument(
+            '--no-cache',
+            action='store_true',
+            help='Always recompute the query embedding instead of using the on-disk cache',
+        )
+    
+    def _cached_embed(self, engine, query_text, use_cache=True):
+        """Generate the query embedding, reusing a cached copy from a previous run"""
+        if not use_cache:
+            return engine.generate_query_embedding(query_text)
+        
+        # Key on the model too so switching models doesn't return stale vectors
+        key = f"{engine.config.embedding_model}:{query_text}"
+        cache_path = EMBEDDING_CACHE_DIR / f"{hashlib.sha1(key.encode('utf-8')).hexdigest()}.npy"
+        
+        if cache_path.exists():
+            self.stdout.write("💾 Using cached query embedding")
+            return np.load(cache_path)
+        
+        embedding = engine.generate_query_embedding(query_text)
+        try:
+            EMBEDDING_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            np.save(cache_path, embedding)
+        except OSError as e:
+            self.stdout.write(self.style.WARNING(f"⚠️ Could not cache embedding: {e}"))
+        return embedding
     
     def handle(self, *args, **options):
         """Test semantic search"""
         query_text = options['query']
         user_id = options.get('user_id')
+        use_cache = not options['no_cache']
         
         self.stdout.write(self.style.HTTP_INFO("🔍 Testing Semantic Search"))
-        self.stdout.write("="*60)
+        self.stdout.write(SEP_HEAVY)
         
         # Get user if specified
         user = None
@@ -58,7 +97,7 @@ class Command(BaseCommand):
             self.stdout.write(f"📊 User's chunks: {user_chunks}")
         
         self.stdout.write(f"❓ Query: {query_text}")
-        self.stdout.write("-"*60)
+        self.stdout.write(SEP_WIDE)
         
         try:
             # Initialize RAG engine
@@ -67,7 +106,7 @@ class Command(BaseCommand):
             
             # Generate query embedding
             self.stdout.write("🧠 Generating query embedding...")
-            query_embedding = engine.generate_query_embedding(query_text)
+            query_embedding = self._cached_embed(engine, query_text, use_cache)
             self.stdout.write(f"✅ Embedding generated: {len(query_embedding)} dimensions")
             
             # Search for similar chunks
@@ -76,7 +115,7 @@ class Command(BaseCommand):
             
             # Display results
             self.stdout.write(f"\n📚 Found {len(search_results)} relevant chunks:")
-            self.stdout.write("-"*60)
+            self.stdout.write(SEP_WIDE)
             
             if search_results:
                 for i, result in enumerate(search_results, 1):
@@ -92,7 +131,7 @@ class Command(BaseCommand):
                     
                 # Test context assembly
                 self.stdout.write(f"\n📝 Assembled Context:")
-                self.stdout.write("-"*60)
+                self.stdout.write(SEP_WIDE)
                 context = engine.assemble_context(search_results)
                 self.stdout.write(f"Context length: {len(context)} characters")
                 self.stdout.write(f"Preview: {context[:300]}...")
@@ -109,7 +148,7 @@ class Command(BaseCommand):
                     self.stdout.write(f"Best match: {best_result.similarity_score:.3f} similarity")
                     self.stdout.write(f"Content: {best_result.chunk.content[:200]}...")
             
-            self.stdout.write("\n" + "="*60)
+            self.stdout.write("\n" + SEP_HEAVY)
             self.stdout.write(
                 self.style.SUCCESS("🎉 Semantic search test completed!")
             )
@@ -0,0 +1,18 @@
+# Generated by Django 4.2 on 2026-10-15 09:12
+
+import django.contrib.postgres.indexes
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rag_app', '0003_querysession_systemanalytics_querysuggestion_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='querylog',
+            index=django.contrib.postgres.indexes.HashIndex(fields=['query_text'], name='rag_app_que_query_t_5381b0_hash'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2 on 2026-10-15 09:40
+
+from django.db import migrations
+import pgvector.django.halfvec
+
+
+class Migration(migrations.Migration):
+    """
+    Convert embeddings from vector (fp32) to halfvec (fp16).
+    Requires the pgvector extension >= 0.7.0.
+    """
+
+    dependencies = [
+        ('rag_app', '0004_querylog_query_text_hash'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='embedding',
+            name='vector',
+            field=pgvector.django.halfvec.HalfVectorField(blank=True, dimensions=768, null=True),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2 on 2026-10-15 10:05
+
+from django.db import migrations
+import pgvector.django.indexes
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rag_app', '0005_alter_embedding_vector'),
+    ]
+
+    operations = [
+        # Give the index build more memory and parallel workers; SET LOCAL
+        # keeps this scoped to the migration transaction
+        migrations.RunSQL(
+            "SET LOCAL maintenance_work_mem = '2GB'; SET LOCAL max_parallel_maintenance_workers = 7;",
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.AddIndex(
+            model_name='embedding',
+            index=pgvector.django.indexes.HnswIndex(ef_construction=128, fields=['vector'], m=24, name='rag_app_emb_vector_hnsw', opclasses=['halfvec_cosine_ops']),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2 on 2026-10-15 11:20
+
+from django.contrib.postgres.operations import AddIndexConcurrently, RemoveIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Concurrent index operations can't run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('rag_app', '0006_embedding_hnsw_index'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='querylog',
+            index=models.Index(fields=['llm_model', '-created_at'], name='rag_app_que_llm_mod_220ad8_idx'),
+        ),
+        RemoveIndexConcurrently(
+            model_name='querylog',
+            name='rag_app_que_llm_mod_0d3074_idx',
+        ),
+    ]
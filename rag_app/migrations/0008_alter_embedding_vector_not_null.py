@@ -0,0 +1,24 @@
+# Generated by Django 4.2 on 2026-10-15 11:45
+
+from django.db import migrations
+import pgvector.django.halfvec
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rag_app', '0007_querylog_llm_model_created_at'),
+    ]
+
+    operations = [
+        # Embeddings without a vector are unusable for search
+        migrations.RunSQL(
+            "DELETE FROM rag_app_embedding WHERE vector IS NULL;",
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.AlterField(
+            model_name='embedding',
+            name='vector',
+            field=pgvector.django.halfvec.HalfVectorField(dimensions=768),
+        ),
+    ]
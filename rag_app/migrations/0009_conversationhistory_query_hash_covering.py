@@ -0,0 +1,29 @@
+# Generated by Django 4.2 on 2026-10-15 12:02
+
+from django.contrib.postgres.operations import AddIndexConcurrently, RemoveIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Concurrent index operations and VACUUM can't run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('rag_app', '0008_alter_embedding_vector_not_null'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='conversationhistory',
+            index=models.Index(fields=['query_hash'], include=['response_source', 'tokens_used'], name='rag_app_con_qhash_cover_idx'),
+        ),
+        RemoveIndexConcurrently(
+            model_name='conversationhistory',
+            name='rag_app_con_query_h_99621b_idx',
+        ),
+        # Index-only scans need an up-to-date visibility map
+        migrations.RunSQL(
+            "VACUUM (ANALYZE) rag_app_conversationhistory;",
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
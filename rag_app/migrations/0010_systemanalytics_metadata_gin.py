@@ -0,0 +1,21 @@
+# Generated by Django 4.2 on 2026-10-15 12:20
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    # Concurrent index operations can't run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('rag_app', '0009_conversationhistory_query_hash_covering'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='systemanalytics',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['metadata'], name='rag_app_sys_meta_gin', opclasses=['jsonb_path_ops']),
+        ),
+    ]
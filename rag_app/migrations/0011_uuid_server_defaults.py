@@ -0,0 +1,35 @@
+# Generated by Django 4.2 on 2026-10-15 12:41
+
+from django.db import migrations
+
+
+# Tables with a UUID primary key
+UUID_TABLES = [
+    'rag_app_document',
+    'rag_app_documentchunk',
+    'rag_app_embedding',
+    'rag_app_querylog',
+    'rag_app_querysession',
+    'rag_app_conversationhistory',
+    'rag_app_systemanalytics',
+    'rag_app_querysuggestion',
+]
+
+
+class Migration(migrations.Migration):
+    """
+    Give UUID primary keys a server-side gen_random_uuid() default (built in
+    since PostgreSQL 13) so raw SQL/COPY inserts can omit the id. The ORM
+    keeps generating ids client-side - Django 4.2 has no db_default.
+    """
+
+    dependencies = [
+        ('rag_app', '0010_systemanalytics_metadata_gin'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            [f"ALTER TABLE {table} ALTER COLUMN id SET DEFAULT gen_random_uuid();" for table in UUID_TABLES],
+            reverse_sql=[f"ALTER TABLE {table} ALTER COLUMN id DROP DEFAULT;" for table in UUID_TABLES],
+        ),
+    ]
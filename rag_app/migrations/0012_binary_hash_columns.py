@@ -0,0 +1,52 @@
+# Generated by Django 4.2 on 2026-10-15 13:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """
+    Store SHA256 hashes as 32-byte bytea instead of 64 hex characters.
+    Django's own ALTER would cast the hex text to bytea byte-for-byte, so the
+    column conversion uses decode(..., 'hex') directly.
+    """
+
+    dependencies = [
+        ('rag_app', '0011_uuid_server_defaults'),
+    ]
+
+    operations = [
+        # Redundant with the unique constraint's index
+        migrations.RemoveIndex(
+            model_name='document',
+            name='rag_app_doc_content_12be6b_idx',
+        ),
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(
+                    [
+                        # varchar_pattern_ops index Django adds for unique CharFields; invalid for bytea
+                        "DROP INDEX IF EXISTS rag_app_document_content_hash_088ef728_like;",
+                        "ALTER TABLE rag_app_document ALTER COLUMN content_hash TYPE bytea USING decode(content_hash, 'hex');",
+                        "ALTER TABLE rag_app_conversationhistory ALTER COLUMN query_hash TYPE bytea USING decode(query_hash, 'hex');",
+                    ],
+                    reverse_sql=[
+                        "ALTER TABLE rag_app_conversationhistory ALTER COLUMN query_hash TYPE varchar(64) USING encode(query_hash, 'hex');",
+                        "ALTER TABLE rag_app_document ALTER COLUMN content_hash TYPE varchar(64) USING encode(content_hash, 'hex');",
+                        "CREATE INDEX rag_app_document_content_hash_088ef728_like ON rag_app_document (content_hash varchar_pattern_ops);",
+                    ],
+                ),
+            ],
+            state_operations=[
+                migrations.AlterField(
+                    model_name='document',
+                    name='content_hash',
+                    field=models.BinaryField(max_length=32, unique=True),
+                ),
+                migrations.AlterField(
+                    model_name='conversationhistory',
+                    name='query_hash',
+                    field=models.BinaryField(help_text='Raw SHA256 digest of query for deduplication', max_length=32),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2 on 2026-10-15 13:30
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    # Concurrent index operations can't run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('rag_app', '0012_binary_hash_columns'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='conversationhistory',
+            index=django.contrib.postgres.indexes.BrinIndex(fields=['created_at'], name='rag_app_con_created_brin'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.2 on 2026-10-15 14:10
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    HNSW index over the binary-quantized embedding (1 bit per dimension, 96
+    bytes per row for 768-d) used as the candidate stage when
+    rag_binary_rerank_factor > 0. It's an expression index, so there is no
+    extra column to populate or backfill.
+    """
+
+    # Concurrent index operations can't run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('rag_app', '0013_conversationhistory_created_at_brin'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS rag_app_emb_vector_bq_hnsw "
+            "ON rag_app_embedding USING hnsw ((binary_quantize(vector)::bit(768)) bit_hamming_ops);",
+            reverse_sql="DROP INDEX CONCURRENTLY IF EXISTS rag_app_emb_vector_bq_hnsw;",
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2 on 2026-10-15 14:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rag_app', '0014_embedding_binary_quantized_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='documentchunk',
+            name='display_header',
+            field=models.CharField(blank=True, max_length=300),
+        ),
+        # Backfill existing chunks; must match DocumentChunk.format_header
+        migrations.RunSQL(
+            "UPDATE rag_app_documentchunk AS c "
+            "SET display_header = '[Document: ' || d.title || '] ' "
+            "FROM rag_app_document AS d WHERE c.document_id = d.id;",
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
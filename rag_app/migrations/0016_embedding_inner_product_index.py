@@ -0,0 +1,52 @@
+# Generated by Django 4.2 on 2026-10-15 15:30
+
+from django.db import migrations
+import pgvector.django.indexes
+
+
+class Migration(migrations.Migration):
+    """
+    Normalize stored embeddings to unit length and rebuild the HNSW index
+    with halfvec_ip_ops so searches can use <#> instead of <=>
+    """
+
+    dependencies = [
+        ('rag_app', '0015_documentchunk_display_header'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            "SET LOCAL maintenance_work_mem = '2GB'; SET LOCAL max_parallel_maintenance_workers = 7;",
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        # Drop both HNSW indexes before rewriting every vector: each row update
+        # is non-HOT and would otherwise be inserted into both graphs, only for
+        # the cosine one to be thrown away and the binary one left bloated
+        migrations.RemoveIndex(
+            model_name='embedding',
+            name='rag_app_emb_vector_hnsw',
+        ),
+        migrations.RunSQL(
+            "DROP INDEX IF EXISTS rag_app_emb_vector_bq_hnsw;",
+            reverse_sql=(
+                "CREATE INDEX IF NOT EXISTS rag_app_emb_vector_bq_hnsw "
+                "ON rag_app_embedding USING hnsw ((binary_quantize(vector)::bit(768)) bit_hamming_ops);"
+            ),
+        ),
+        # sentence-transformers models like all-mpnet-base-v2 already emit unit
+        # vectors; this covers rows from models that don't
+        migrations.RunSQL(
+            "UPDATE rag_app_embedding SET vector = l2_normalize(vector);",
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.AddIndex(
+            model_name='embedding',
+            index=pgvector.django.indexes.HnswIndex(ef_construction=128, fields=['vector'], m=24, name='rag_app_emb_vector_hnsw', opclasses=['halfvec_ip_ops']),
+        ),
+        # Rebuilt from the normalized vectors (same definition as 0014)
+        migrations.RunSQL(
+            "CREATE INDEX IF NOT EXISTS rag_app_emb_vector_bq_hnsw "
+            "ON rag_app_embedding USING hnsw ((binary_quantize(vector)::bit(768)) bit_hamming_ops);",
+            reverse_sql="DROP INDEX IF EXISTS rag_app_emb_vector_bq_hnsw;",
+        ),
+    ]
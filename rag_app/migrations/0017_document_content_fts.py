@@ -0,0 +1,22 @@
+# Generated by Django 4.2 on 2026-10-15 16:10
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    # Concurrent index operations can't run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('rag_app', '0016_embedding_inner_product_index'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='document',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.search.SearchVector('content', config='english'), name='rag_app_doc_content_fts'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2 on 2026-10-15 16:40
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Concurrent index operations can't run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('rag_app', '0017_document_content_fts'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='document',
+            index=models.Index(fields=['uploaded_by', 'status', '-uploaded_at'], name='rag_app_doc_user_status_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='document',
+            index=models.Index(fields=['uploaded_by', 'file_type', '-uploaded_at'], name='rag_app_doc_user_type_idx'),
+        ),
+    ]
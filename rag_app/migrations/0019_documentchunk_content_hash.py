@@ -0,0 +1,27 @@
+# Generated by Django 4.2 on 2026-10-15 17:20
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Concurrent index operations can't run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('rag_app', '0018_document_list_filter_indexes'),
+    ]
+
+    operations = [
+        # Existing chunks stay NULL (Postgres has no built-in BLAKE2); they're
+        # hashed when their document is reprocessed
+        migrations.AddField(
+            model_name='documentchunk',
+            name='content_hash',
+            field=models.BinaryField(max_length=16, null=True),
+        ),
+        AddIndexConcurrently(
+            model_name='documentchunk',
+            index=models.Index(fields=['content_hash'], name='rag_app_chunk_content_hash_idx'),
+        ),
+    ]
@@ -126,10 +126,10 @@ def models_api(request):
                 'categories': get_model_categories(model)
             })
         
-        return JsonResponse({
+        payload = {
             'success': True,
             'models': models_data,
-            'total_count': len(models_data),
+            'total_count': len(models),
             'filtered_count': len(models_data),
             'connection_status': client.test_connection(),
             'default_model': client.default_model,
@@ -141,7 +141,10 @@ def models_api(request):
                 'min_context': min_context,
                 'sort': sort_by
             }
-        })
+        }
+        
+        # Compact separators - the model list is large and never read by humans
+        return JsonResponse(payload, json_dumps_params={'separators': (',', ':')})
         
     except Exception as e:
         logger.error(f"Error in models API: {e}")
@@ -1,10 +1,25 @@
-from django.db import models
+from django.db import connection, models, transaction
 from django.contrib.auth.models import User
+from django.contrib.postgres.indexes import BrinIndex, GinIndex, HashIndex
+from django.contrib.postgres.search import SearchVector
 from django.utils import timezone
-from pgvector.django import VectorField
+from pgvector import HalfVector
+from pgvector.django import BitField, HalfVectorField, HammingDistance, HnswIndex, MaxInnerProduct
+import io
+import numpy as np
 import uuid
 
 
+# Text search config for document content; the GIN index and the queries
+# that should use it must build the same to_tsvector() expression
+DOCUMENT_SEARCH_CONFIG = 'english'
+
+
+def document_content_search_vector():
+    """The indexed full-text search vector over Document.content"""
+    return SearchVector('content', config=DOCUMENT_SEARCH_CONFIG)
+
+
 class Document(models.Model):
     """
     Stores uploaded documents and their metadata
@@ -19,7 +34,7 @@ class Document(models.Model):
     
     # Content and processing
     content = models.TextField()  # Extracted text content
-    content_hash = models.CharField(max_length=64, unique=True)  # SHA256 hash for deduplication
+    content_hash = models.BinaryField(max_length=32, unique=True)  # Raw SHA256 digest for deduplication
     chunk_count = models.IntegerField(default=0)  # Number of chunks created
     
     # Processing status
@@ -47,13 +62,68 @@ class Document(models.Model):
             models.Index(fields=['status']),
             models.Index(fields=['file_type']),
             models.Index(fields=['uploaded_by']),
-            models.Index(fields=['content_hash']),
+            GinIndex(document_content_search_vector(), name='rag_app_doc_content_fts'),
+            # Document list filters: one user's documents by status/type, newest first
+            models.Index(fields=['uploaded_by', 'status', '-uploaded_at'], name='rag_app_doc_user_status_idx'),
+            models.Index(fields=['uploaded_by', 'file_type', '-uploaded_at'], name='rag_app_doc_user_type_idx'),
         ]
     
     def __str__(self):
         return f"{self.title} ({self.file_name})"
 
 
+class DocumentChunkQuerySet(models.QuerySet):
+    """
+    QuerySet helpers for iterating large numbers of chunks
+    """
+    
+    def chunked(self, chunk_size=2000):
+        """
+        Iterate over the queryset in primary-key pages of chunk_size rows
+        
+        Keeps memory bounded like iterator() while still honouring
+        select_related/prefetch_related on each page. Rows are yielded in
+        primary-key order, not the queryset's own ordering.
+        """
+        queryset = self.order_by('pk')
+        last_pk = None
+        
+        while True:
+            page = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+            page = list(page[:chunk_size])
+            if not page:
+                return
+            
+            yield from page
+            last_pk = page[-1].pk
+    
+    def delete_in_db(self):
+        """
+        Delete these chunks and the rows that reference them with one
+        DELETE per table, instead of loading every chunk into Django's
+        deletion collector. No delete signals are sent.
+        """
+        if self.query.is_sliced:
+            raise TypeError("Cannot delete a sliced queryset")
+        
+        from .signals import invalidate_corpus_versions
+        
+        chunks = self.order_by()
+        query_log_links = QueryLog.source_chunks.through.objects.filter(documentchunk__in=chunks)
+        embeddings = Embedding.objects.filter(chunk__in=chunks)
+        # No signals fire, so cached responses citing these chunks are orphaned here
+        user_ids = set(
+            Document.objects.filter(chunks__in=chunks).values_list('uploaded_by_id', flat=True)
+        )
+        
+        with transaction.atomic(using=self.db):
+            query_log_links._raw_delete(self.db)
+            embeddings._raw_delete(self.db)
+            deleted = chunks._raw_delete(self.db)
+            transaction.on_commit(lambda: invalidate_corpus_versions(user_ids), using=self.db)
+        return deleted
+
+
 class DocumentChunk(models.Model):
     """
     Stores document chunks for embedding and retrieval
@@ -72,18 +142,110 @@ class DocumentChunk(models.Model):
     word_count = models.IntegerField(default=0)
     char_count = models.IntegerField(default=0)
     
+    # Static "[Document: ...]" prefix for LLM context, denormalized at ingest
+    display_header = models.CharField(max_length=300, blank=True)
+    
+    # BLAKE2b-128 digest of content; chunks with known content reuse stored embeddings
+    content_hash = models.BinaryField(max_length=16, null=True)
+    
     # Processing timestamps
     created_at = models.DateTimeField(default=timezone.now)
     
+    objects = DocumentChunkQuerySet.as_manager()
+    
     class Meta:
         ordering = ['document', 'chunk_index']
         unique_together = ['document', 'chunk_index']
         indexes = [
             models.Index(fields=['document', 'chunk_index']),
+            models.Index(fields=['content_hash'], name='rag_app_chunk_content_hash_idx'),
         ]
     
     def __str__(self):
         return f"{self.document.title} - Chunk {self.chunk_index}"
+    
+    @staticmethod
+    def format_header(title):
+        """Context header for chunks of a document with the given title"""
+        return f"[Document: {title}] "
+
+
+class EmbeddingQuerySet(models.QuerySet):
+    """
+    QuerySet helpers for vector similarity search
+    """
+    
+    def nearest(self, vector, k):
+        """
+        Return the k embeddings closest to vector by inner product (cosine
+        similarity, since stored vectors are unit length); vector should be
+        normalized too
+        
+        Emits ORDER BY vector <#> %s LIMIT k, which the vector index can serve.
+        Don't order by anything derived from the distance (e.g. -distance or
+        an annotated similarity score) - the planner then skips the index and
+        sorts the whole table.
+        """
+        if not isinstance(vector, HalfVector):
+            vector = HalfVector(vector)
+        return self.order_by(MaxInnerProduct('vector', vector))[:k]
+    
+    def binary_nearest(self, vector, k):
+        """
+        Return the k embeddings closest to vector by Hamming distance between
+        binary-quantized vectors (one bit per dimension, set where > 0)
+        
+        Served by the rag_app_emb_vector_bq_hnsw expression index. The ranking
+        is coarse; use it to fetch candidates and rerank them by cosine distance.
+        """
+        if isinstance(vector, HalfVector):
+            vector = vector.to_numpy()
+        bits = ''.join(np.where(np.asarray(vector) > 0, '1', '0'))
+        return self.order_by(
+            HammingDistance(BinaryQuantize('vector', dimensions=len(bits)), models.Value(bits))
+        )[:k]
+    
+    def by_chunk_hash(self, hashes, model_name):
+        """
+        Map chunk content hash -> (stored vector as a NumPy array, chunk
+        token count) for embeddings that model_name made of chunks with any
+        of the given hashes
+        """
+        rows = self.filter(
+            chunk__content_hash__in=hashes, model_name=model_name
+        ).values_list('chunk__content_hash', 'vector', 'chunk__token_count')
+        return {
+            bytes(content_hash): (vector.to_numpy(), token_count)
+            for content_hash, vector, token_count in rows
+        }
+
+
+class BinaryQuantize(models.Func):
+    """
+    binary_quantize(vector)::bit(n) - must match the expression the
+    rag_app_emb_vector_bq_hnsw index was built on for the planner to use it
+    """
+    function = 'binary_quantize'
+    template = '(%(function)s(%(expressions)s)::bit(%(dimensions)d))'
+    
+    def __init__(self, expression, dimensions, **extra):
+        super().__init__(expression, dimensions=dimensions, output_field=BitField(length=dimensions), **extra)
+
+
+class EmbeddingManager(models.Manager.from_queryset(EmbeddingQuerySet)):
+    """
+    Default manager that leaves the (TOASTed) vector column out of SELECTs
+    
+    Metadata queries and admin listings don't need the vector; use
+    with_vector() where the values are actually read.
+    """
+    
+    def get_queryset(self):
+        return super().get_queryset().defer('vector')
+    
+    def with_vector(self):
+        """Queryset that loads the vector column"""
+        return super().get_queryset()
 
 
 class Embedding(models.Model):
@@ -93,8 +255,9 @@ class Embedding(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     chunk = models.OneToOneField(DocumentChunk, on_delete=models.CASCADE, related_name='embedding')
     
-    # Vector embedding (768 dimensions for all-mpnet-base-v2)
-    vector = VectorField(dimensions=768, null=True, blank=True)
+    # Vector embedding (768 dimensions for all-mpnet-base-v2), L2-normalized at ingest
+    # Stored as halfvec (fp16) - half the bytes per row for index probes, negligible recall loss
+    vector = HalfVectorField(dimensions=768)
     
     # Embedding metadata
     model_name = models.CharField(max_length=100, default='all-mpnet-base-v2')
@@ -105,14 +268,70 @@ class Embedding(models.Model):
     created_at = models.DateTimeField(default=timezone.now)
     processing_time = models.FloatField(default=0.0)  # Time in seconds to generate embedding
     
+    objects = EmbeddingManager()
+    
     class Meta:
         indexes = [
             models.Index(fields=['model_name']),
             models.Index(fields=['created_at']),
+            # ANN index for similarity search; vectors are unit length, so inner
+            # product ranks the same as cosine without per-row norms
+            HnswIndex(
+                name='rag_app_emb_vector_hnsw',
+                fields=['vector'],
+                m=24,
+                ef_construction=128,
+                opclasses=['halfvec_ip_ops'],
+            ),
         ]
     
     def __str__(self):
         return f"Embedding for {self.chunk}"
+    
+    @classmethod
+    def copy_from(cls, rows, model_name='all-mpnet-base-v2', processing_time=0.0):
+        """
+        Bulk insert embeddings with a single COPY instead of per-row INSERTs
+        
+        Args:
+            rows: Iterable of (chunk_id, vector) pairs
+            model_name: Embedding model that produced the vectors
+            processing_time: Per-embedding generation time in seconds
+        
+        Returns:
+            Number of embeddings written
+        """
+        created_at = timezone.now().isoformat()
+        buffer = io.StringIO()
+        count = 0
+        
+        for chunk_id, vector in rows:
+            if not isinstance(vector, HalfVector):
+                vector = HalfVector(vector)
+            buffer.write('\t'.join([
+                str(chunk_id),
+                vector.to_text(),
+                model_name,
+                '1.0',
+                str(vector.dimensions()),
+                created_at,
+                repr(float(processing_time)),
+            ]) + '\n')
+            count += 1
+        
+        if not count:
+            return 0
+        
+        buffer.seek(0)
+        # id is left to the column's gen_random_uuid() default
+        columns = ['chunk_id', 'vector', 'model_name', 'model_version',
+                   'dimensions', 'created_at', 'processing_time']
+        with connection.cursor() as cursor:
+            cursor.copy_expert(
+                f'COPY "{cls._meta.db_table}" ({", ".join(columns)}) FROM STDIN',
+                buffer
+            )
+        return count
 
 
 class QueryLog(models.Model):
@@ -162,7 +381,11 @@ class QueryLog(models.Model):
         indexes = [
             models.Index(fields=['user']),
             models.Index(fields=['created_at']),
-            models.Index(fields=['llm_model']),
+            # Per-model listings newest first (admin llm_model filter + -created_at ordering)
+            models.Index(fields=['llm_model', '-created_at']),
+            # Equality lookups on the raw query text; hash index since queries can
+            # exceed the btree row size limit
+            HashIndex(fields=['query_text']),
         ]
     
     def __str__(self):
@@ -236,7 +459,7 @@ class ConversationHistory(models.Model):
     
     # Query details
     query_text = models.TextField()
-    query_hash = models.CharField(max_length=64, help_text="SHA256 hash of query for deduplication")
+    query_hash = models.BinaryField(max_length=32, help_text="Raw SHA256 digest of query for deduplication")
     
     # Response details
     response_text = models.TextField()
@@ -266,9 +489,18 @@ class ConversationHistory(models.Model):
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['session', 'created_at']),
-            models.Index(fields=['query_hash']),
+            # Covering index so repeat-query checks are index-only scans. response_text
+            # is left out: long LLM answers would exceed the btree row size limit
+            models.Index(
+                fields=['query_hash'],
+                include=['response_source', 'tokens_used'],
+                name='rag_app_con_qhash_cover_idx',
+            ),
             models.Index(fields=['is_bookmarked']),
             models.Index(fields=['user_rating']),
+            # Rows are append-only, so created_at follows physical order; a BRIN
+            # index serves the analytics date-window scans at a few pages in size
+            BrinIndex(fields=['created_at'], name='rag_app_con_created_brin'),
         ]
     
     def __str__(self):
@@ -307,6 +539,8 @@ class SystemAnalytics(models.Model):
             models.Index(fields=['metric_name', 'recorded_at']),
             models.Index(fields=['category', 'recorded_at']),
             models.Index(fields=['user', 'recorded_at']),
+            # metadata__contains lookups; jsonb_path_ops is smaller than the default GIN opclass
+            GinIndex(name='rag_app_sys_meta_gin', fields=['metadata'], opclasses=['jsonb_path_ops']),
         ]
     
     def __str__(self):
@@ -2,13 +2,34 @@
 OpenRouter API client with model selection and management
 """
 import os
+import re
+import json
 import requests
 import logging
-from typing import Dict, List, Optional, Any
+import time
+from operator import attrgetter
+import numpy as np
+import pandas as pd
+from requests.adapters import HTTPAdapter
+from typing import Dict, Iterator, List, Optional, Any
 from dataclasses import dataclass
+from django.core.cache import cache
 
 logger = logging.getLogger(__name__)
 
+# Cache entry for the parsed /models response and its validators
+MODELS_CACHE_KEY = 'openrouter:models'
+MODELS_CACHE_TIMEOUT = 24 * 60 * 60  # seconds
+# Within this window the cached list is served without contacting OpenRouter
+MODELS_FRESH_SECONDS = 10 * 60
+# ModelTable built from the same fetched list, so pricing never rebuilds it
+MODEL_TABLE_CACHE_KEY = 'openrouter:model_table'
+
+# Model ids that are clearly not for text generation
+SKIP_MODEL_PATTERN = re.compile(
+    r'whisper|dall-e|tts-|embedding|moderation|vision-only|audio-only|image-only'
+)
+
 @dataclass
 class ModelInfo:
     """Information about an available model"""
@@ -19,6 +40,52 @@ class ModelInfo:
     context_length: int
     provider: str
 
+@dataclass
+class ModelTable:
+    """
+    Column-oriented pricing table for cost calculations
+    
+    One array per field plus an id -> row index map, so costing a query is
+    a single lookup and bulk costing is one vectorised multiply-add.
+    """
+    ids: np.ndarray
+    prompt_price: np.ndarray
+    completion_price: np.ndarray
+    context_length: np.ndarray
+    index: Dict[str, int]
+    
+    @classmethod
+    def from_models(cls, models: List[ModelInfo]) -> 'ModelTable':
+        """Build the table from a list of ModelInfo objects"""
+        ids = [model.id for model in models]
+        return cls(
+            ids=np.array(ids, dtype=object),
+            prompt_price=np.array([model.pricing.get('prompt', 0.0) for model in models], dtype=np.float64),
+            completion_price=np.array([model.pricing.get('completion', 0.0) for model in models], dtype=np.float64),
+            context_length=np.array([model.context_length for model in models], dtype=np.int64),
+            index={model_id: row for row, model_id in enumerate(ids)},
+        )
+    
+    def cost(self, model_id: str, prompt_tokens: int, completion_tokens: int) -> float:
+        """Cost of one request, in the same units as the model pricing (0.0 for unknown models)"""
+        row = self.index.get(model_id)
+        if row is None:
+            return 0.0
+        return float(self.prompt_price[row] * prompt_tokens + self.completion_price[row] * completion_tokens)
+    
+    def costs(self, model_ids: List[str], prompt_tokens: np.ndarray, completion_tokens: np.ndarray) -> np.ndarray:
+        """Vectorised cost for many requests (unknown models cost 0.0)"""
+        rows = np.array([self.index.get(model_id, -1) for model_id in model_ids], dtype=np.int64)
+        if not len(self.ids):
+            return np.zeros(len(rows))
+        known = rows >= 0
+        rows = np.where(known, rows, 0)
+        result = (
+            self.prompt_price[rows] * np.asarray(prompt_tokens, dtype=np.float64) +
+            self.completion_price[rows] * np.asarray(completion_tokens, dtype=np.float64)
+        )
+        return np.where(known, result, 0.0)
+
 class OpenRouterClient:
     """
     Client for interacting with OpenRouter API
@@ -37,6 +104,14 @@ class OpenRouterClient:
         # Use a free model as default - Google Gemini Flash 2.5 is typically free
         self.default_model = os.getenv('OPENROUTER_DEFAULT_MODEL', 'google/gemini-2.5-flash')
         
+        # Reuse TCP/TLS connections across calls instead of a new handshake per request
+        self._session = requests.Session()
+        self._session.mount('https://', HTTPAdapter(pool_connections=10, pool_maxsize=32, pool_block=False))
+        
+        # (loaded_at, ModelTable) for get_model_table; re-read from the cache
+        # every MODELS_FRESH_SECONDS
+        self._model_table: Optional[tuple] = None
+        
         if not self.api_key:
             logger.warning("OPENROUTER_API_KEY not configured")
     
@@ -49,10 +124,13 @@ class OpenRouterClient:
             "X-Title": "RAG Document System",
         }
     
-    def get_available_models(self) -> List[ModelInfo]:
+    def get_available_models(self, refresh: bool = False) -> List[ModelInfo]:
         """
         Fetch available models from OpenRouter
         
+        Args:
+            refresh: Revalidate with OpenRouter even if the cached list is fresh
+        
         Returns:
             List of ModelInfo objects
         """
@@ -60,87 +138,143 @@ class OpenRouterClient:
             logger.warning("No API key available for fetching models")
             return self._get_default_models()
         
+        # Revalidate the cached list instead of re-downloading it
+        cached = cache.get(MODELS_CACHE_KEY)
+        if cached and not refresh and time.time() - cached.get('fetched_at', 0) < MODELS_FRESH_SECONDS:
+            return cached['models']
+        
+        headers = self.get_headers()
+        if cached:
+            if cached.get('etag'):
+                headers['If-None-Match'] = cached['etag']
+            if cached.get('last_modified'):
+                headers['If-Modified-Since'] = cached['last_modified']
+        
         try:
-            response = requests.get(
+            response = self._session.get(
                 f"{self.base_url}/models",
-                headers=self.get_headers(),
+                headers=headers,
                 timeout=30
             )
-            response.raise_for_status()
             
-            models_data = response.json()
-            models = []
+            if response.status_code == 304 and cached:
+                logger.debug("OpenRouter model list not modified, using cached copy")
+                cache.set(MODELS_CACHE_KEY, {**cached, 'fetched_at': time.time()}, MODELS_CACHE_TIMEOUT)
+                if not cache.touch(MODEL_TABLE_CACHE_KEY, MODELS_CACHE_TIMEOUT):
+                    self._store_model_table(cached['models'])
+                return cached['models']
             
-            for model_data in models_data.get('data', []):
-                try:
-                    # Sanitize pricing data
-                    pricing = model_data.get('pricing', {})
-                    
-                    # Ensure pricing values are floats
-                    sanitized_pricing = {}
-                    for key, value in pricing.items():
-                        try:
-                            sanitized_pricing[key] = float(value) if value is not None else 0.0
-                        except (ValueError, TypeError):
-                            sanitized_pricing[key] = 0.0
-                    
-                    # Ensure context_length is an integer
-                    context_length = model_data.get('context_length', 4096)
-                    try:
-                        context_length = int(context_length) if context_length is not None else 4096
-                    except (ValueError, TypeError):
-                        context_length = 4096
-                    
-                    model = ModelInfo(
-                        id=model_data['id'],
-                        name=model_data.get('name', model_data['id']),
-                        description=model_data.get('description', ''),
-                        pricing=sanitized_pricing,
-                        context_length=context_length,
-                        provider=model_data.get('id', '').split('/')[0] if '/' in model_data.get('id', '') else 'unknown'
-                    )
-                    models.append(model)
-                except Exception as e:
-                    logger.warning(f"Error parsing model data: {e}")
-                    continue
+            response.raise_for_status()
+            
+            models = self._parse_models(response.json())
             
             # Filter to recommended models for RAG
             filtered_models = self._filter_recommended_models(models)
             logger.info(f"Found {len(filtered_models)} recommended models")
+            
+            cache.set(MODELS_CACHE_KEY, {
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'models': filtered_models,
+                'fetched_at': time.time(),
+            }, MODELS_CACHE_TIMEOUT)
+            self._store_model_table(filtered_models)
             return filtered_models
             
         except Exception as e:
             logger.error(f"Error fetching models from OpenRouter: {e}")
+            if cached:
+                return cached['models']
             return self._get_default_models()
     
-    def _filter_recommended_models(self, models: List[ModelInfo]) -> List[ModelInfo]:
-        """Filter to models that work well for RAG applications"""
+    def get_model_table(self) -> ModelTable:
+        """
+        Get pricing for the available models as a ModelTable
         
-        # Get ALL models, don't filter by specific IDs
-        # Sort by provider and context length for better organization
-        filtered = []
+        Only models from an OpenRouter /models response are included (USD per
+        token); the built-in fallback list isn't priced in those units, so
+        until a list has been fetched the table is empty. Never contacts
+        OpenRouter: the table is built once per fetched list by
+        get_available_models() and only re-read from the cache here.
+        """
+        memo = self._model_table
+        if memo is None or time.monotonic() - memo[0] >= MODELS_FRESH_SECONDS:
+            table = cache.get(MODEL_TABLE_CACHE_KEY) or ModelTable.from_models([])
+            memo = self._model_table = (time.monotonic(), table)
+        return memo[1]
+    
+    def _store_model_table(self, models: List[ModelInfo]) -> None:
+        """Build the pricing table for a fetched model list and cache it"""
+        table = ModelTable.from_models(models)
+        cache.set(MODEL_TABLE_CACHE_KEY, table, MODELS_CACHE_TIMEOUT)
+        self._model_table = (time.monotonic(), table)
+    
+    def _parse_models(self, models_data: Dict[str, Any]) -> List[ModelInfo]:
+        """
+        Parse the /models payload into ModelInfo objects
         
-        for model in models:
-            # Only filter out models that are clearly not suitable for text generation
-            model_id_lower = model.id.lower()
-            
-            # Skip models that are clearly not for text generation
-            skip_keywords = [
-                'whisper', 'dall-e', 'tts-', 'embedding', 'moderation',
-                'vision-only', 'audio-only', 'image-only'
+        Coerces pricing and context length column-wise with pandas instead of
+        per-value try/except. Unparseable prices become 0.0, missing context
+        lengths 4096, and entries without an id are skipped.
+        """
+        df = pd.json_normalize(models_data.get('data', []), max_level=1)
+        if df.empty or 'id' not in df.columns:
+            return []
+        
+        df = df[df['id'].notna()]
+        ids = df['id'].astype(str)
+        names = df['name'].where(df['name'].notna(), ids) if 'name' in df.columns else ids
+        descriptions = df['description'].fillna('') if 'description' in df.columns else pd.Series('', index=df.index)
+        
+        context_lengths = pd.Series(4096, index=df.index)
+        if 'context_length' in df.columns:
+            context_lengths = pd.to_numeric(df['context_length'], errors='coerce').fillna(4096).astype(int)
+        
+        providers = ids.str.split('/', n=1).str[0].where(ids.str.contains('/', regex=False), 'unknown')
+        
+        # Present-but-invalid prices become 0.0; keys a model doesn't have stay absent
+        pricing_columns = [column for column in df.columns if column.startswith('pricing.')]
+        pricing_records = [{} for _ in range(len(df))]
+        if pricing_columns:
+            raw_pricing = df[pricing_columns]
+            pricing = raw_pricing.apply(pd.to_numeric, errors='coerce')
+            pricing = pricing.where(raw_pricing.isna(), pricing.fillna(0.0))
+            pricing.columns = [column[len('pricing.'):] for column in pricing_columns]
+            pricing_records = [
+                {key: value for key, value in record.items() if pd.notna(value)}
+                for record in pricing.to_dict('records')
             ]
-            
-            if any(keyword in model_id_lower for keyword in skip_keywords):
-                continue
-                
-            # Skip models with very low context length (less than 1000 tokens)
-            if model.context_length < 1000:
-                continue
-                
-            filtered.append(model)
         
-        # Sort by provider name, then by context length (descending)
-        return sorted(filtered, key=lambda x: (x.provider, -x.context_length))
+        return [
+            ModelInfo(
+                id=model_id,
+                name=str(name),
+                description=str(description),
+                pricing=model_pricing,
+                context_length=int(context_length),
+                provider=provider,
+            )
+            for model_id, name, description, model_pricing, context_length, provider in zip(
+                ids, names, descriptions, pricing_records, context_lengths, providers
+            )
+        ]
+    
+    def _filter_recommended_models(self, models: List[ModelInfo]) -> List[ModelInfo]:
+        """Filter to models that work well for RAG applications"""
+        
+        # Get ALL models, don't filter by specific IDs; skip models that are
+        # clearly not for text generation or have very low context length
+        filtered = [
+            model for model in models
+            if model.context_length >= 1000 and not SKIP_MODEL_PATTERN.search(model.id.lower())
+        ]
+        
+        # Sort by provider name, then by context length (descending). Two
+        # stable in-place sorts with C-level key functions instead of a lambda
+        # building a tuple per model.
+        filtered.sort(key=attrgetter('context_length'), reverse=True)
+        filtered.sort(key=attrgetter('provider'))
+        return filtered
     
     def _get_default_models(self) -> List[ModelInfo]:
         """Return expanded default model list when API is unavailable"""
@@ -275,42 +409,131 @@ class OpenRouterClient:
         
         try:
             logger.info(f"Making OpenRouter API request to model: {model}")
-            response = requests.post(
+            response = self._session.post(
                 f"{self.base_url}/chat/completions",
                 headers=self.get_headers(),
                 json=data,
                 timeout=60
             )
             
-            # Enhanced error handling with specific status codes
-            if response.status_code == 401:
-                raise ValueError("Invalid OpenRouter API key. Please check your OPENROUTER_API_KEY in .env file.")
-            elif response.status_code == 404:
-                raise ValueError(f"Model '{model}' not found or not accessible with your API key. Try a different model.")
-            elif response.status_code == 429:
-                raise ValueError("Rate limit exceeded. Please wait a moment and try again.")
-            elif response.status_code == 503:
-                raise ValueError("OpenRouter service temporarily unavailable. Please try again later.")
-            
-            response.raise_for_status()
+            self._check_response_status(response, model)
             result = response.json()
             logger.info(f"OpenRouter API request successful for model: {model}")
             return result
             
-        except requests.exceptions.Timeout:
+        except requests.exceptions.RequestException as e:
+            self._raise_request_error(e)
+    
+    def chat_completion_stream(
+        self, 
+        messages: List[Dict[str, str]], 
+        model: Optional[str] = None,
+        temperature: float = 0.1,
+        max_tokens: int = 1000,
+        usage: Optional[Dict[str, Any]] = None,
+        **kwargs
+    ) -> Iterator[str]:
+        """
+        Stream a chat completion from OpenRouter via server-sent events
+        
+        Args:
+            messages: List of message dictionaries with 'role' and 'content'
+            model: Model ID to use (defaults to configured default)
+            temperature: Sampling temperature (0.0 to 1.0)
+            max_tokens: Maximum tokens in response
+            usage: Optional dict, filled with the token usage sent at the end of the stream
+            **kwargs: Additional parameters
+            
+        Yields:
+            Response text deltas as they arrive
+        """
+        if not self.api_key:
+            raise ValueError("OPENROUTER_API_KEY not configured. Please add your OpenRouter API key to the .env file.")
+        
+        model = model or self.default_model
+        
+        data = {
+            "model": model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "stream": True,
+            "usage": {"include": True},
+            **kwargs
+        }
+        
+        try:
+            logger.info(f"Making streaming OpenRouter API request to model: {model}")
+            response = self._session.post(
+                f"{self.base_url}/chat/completions",
+                headers=self.get_headers(),
+                json=data,
+                timeout=60,
+                stream=True
+            )
+            
+            # Closed on every exit, including an error status, so the pooled
+            # connection goes back to the session
+            with response:
+                if response.status_code >= 400:
+                    # Load the (small) error body while the connection is open;
+                    # _raise_request_error reads it after the response is closed
+                    _ = response.content
+                self._check_response_status(response, model)
+                
+                for line in response.iter_lines():
+                    # Skip keep-alive blank lines and ": comment" lines
+                    if not line.startswith(b'data: '):
+                        continue
+                    
+                    payload = line[len(b'data: '):].decode('utf-8')
+                    if payload == '[DONE]':
+                        break
+                    
+                    chunk = json.loads(payload)
+                    if usage is not None and chunk.get('usage'):
+                        usage.update(chunk['usage'])
+                    
+                    for choice in chunk.get('choices', []):
+                        content = choice.get('delta', {}).get('content')
+                        if content:
+                            yield content
+            
+            logger.info(f"OpenRouter streaming request finished for model: {model}")
+            
+        except requests.exceptions.RequestException as e:
+            self._raise_request_error(e)
+    
+    def _check_response_status(self, response: requests.Response, model: str) -> None:
+        """Raise a descriptive error for failed chat completion responses"""
+        # Enhanced error handling with specific status codes
+        if response.status_code == 401:
+            raise ValueError("Invalid OpenRouter API key. Please check your OPENROUTER_API_KEY in .env file.")
+        elif response.status_code == 404:
+            raise ValueError(f"Model '{model}' not found or not accessible with your API key. Try a different model.")
+        elif response.status_code == 429:
+            raise ValueError("Rate limit exceeded. Please wait a moment and try again.")
+        elif response.status_code == 503:
+            raise ValueError("OpenRouter service temporarily unavailable. Please try again later.")
+        
+        response.raise_for_status()
+    
+    def _raise_request_error(self, e: requests.exceptions.RequestException) -> None:
+        """Convert a requests exception into a user-facing ValueError"""
+        if isinstance(e, requests.exceptions.Timeout):
             raise ValueError("Request timed out. OpenRouter service may be slow. Please try again.")
-        except requests.exceptions.ConnectionError:
+        if isinstance(e, requests.exceptions.ConnectionError):
             raise ValueError("Cannot connect to OpenRouter. Please check your internet connection.")
-        except requests.exceptions.RequestException as e:
-            logger.error(f"OpenRouter API request failed: {e}")
-            if hasattr(e, 'response') and e.response is not None:
-                try:
-                    error_data = e.response.json()
-                    error_msg = error_data.get('error', {}).get('message', str(e))
-                    raise ValueError(f"OpenRouter API error: {error_msg}")
-                except:
-                    pass
-            raise ValueError(f"OpenRouter API request failed: {str(e)}")
+        
+        logger.error(f"OpenRouter API request failed: {e}")
+        if getattr(e, 'response', None) is not None:
+            try:
+                error_msg = e.response.json().get('error', {}).get('message', str(e))
+            except (ValueError, AttributeError):
+                error_msg = None
+            if error_msg:
+                raise ValueError(f"OpenRouter API error: {error_msg}")
+        raise ValueError(f"OpenRouter API request failed: {str(e)}")
     
     def simple_chat(
         self, 
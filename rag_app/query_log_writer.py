@@ -0,0 +1,122 @@
+"""
+Background writer for QueryLog rows
+
+Queries hand their log entry to a queue and return immediately; a daemon
+thread bulk-inserts the entries (and their source_chunks links) in batches.
+"""
+import atexit
+import logging
+import queue
+import threading
+import time
+from typing import List, Optional
+
+from django.db import IntegrityError, close_old_connections, connection, transaction
+
+from .models import DocumentChunk, QueryLog
+
+logger = logging.getLogger(__name__)
+
+QUERY_LOG_BATCH_SIZE = 50
+QUERY_LOG_FLUSH_INTERVAL = 0.5  # seconds
+
+
+class QueryLogWriter:
+    """
+    Batches QueryLog inserts on a single background thread
+    
+    The thread starts on the first submit(), so management commands that
+    never log a query don't spawn it.
+    """
+    
+    def __init__(self, batch_size: int = QUERY_LOG_BATCH_SIZE,
+                 flush_interval: float = QUERY_LOG_FLUSH_INTERVAL):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: queue.Queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker: Optional[threading.Thread] = None
+    
+    def submit(self, query_log: QueryLog, chunk_ids: List) -> None:
+        """Queue an unsaved QueryLog and the ids of its source chunks"""
+        self._ensure_worker()
+        self._queue.put((query_log, chunk_ids))
+    
+    def flush(self) -> None:
+        """Block until everything queued so far has been written"""
+        if self._worker is not None:
+            self._queue.join()
+    
+    def _ensure_worker(self) -> None:
+        if self._worker is None:
+            with self._lock:
+                if self._worker is None:
+                    self._worker = threading.Thread(target=self._run, name='query-log-writer', daemon=True)
+                    self._worker.start()
+                    atexit.register(self.flush)
+    
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            
+            try:
+                self._write(batch)
+            except Exception as e:
+                # Don't let a bad batch kill the writer; logging is best-effort
+                logger.error(f"Failed to write {len(batch)} query logs: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+    
+    def _write(self, batch) -> None:
+        close_old_connections()
+        try:
+            through = QueryLog.source_chunks.through
+            links = [
+                through(querylog_id=query_log.id, documentchunk_id=chunk_id)
+                for query_log, chunk_ids in batch
+                for chunk_id in chunk_ids
+            ]
+            try:
+                self._insert(batch, links)
+            except IntegrityError:
+                if not links:
+                    raise
+                # A source chunk was deleted (document reprocessed or removed)
+                # after its query ran; keep the logs and drop the dead links
+                live_chunk_ids = set(DocumentChunk.objects.filter(
+                    id__in={link.documentchunk_id for link in links}
+                ).values_list('id', flat=True))
+                self._insert(batch, [link for link in links if link.documentchunk_id in live_chunk_ids])
+            logger.debug(f"Wrote {len(batch)} query logs")
+        finally:
+            # Idle between batches; don't hold a connection open meanwhile
+            connection.close()
+    
+    def _insert(self, batch, links) -> None:
+        """Insert the batch's QueryLogs and source chunk links in one transaction"""
+        with transaction.atomic():
+            QueryLog.objects.bulk_create([query_log for query_log, _ in batch])
+            if links:
+                QueryLog.source_chunks.through.objects.bulk_create(links)
+
+_query_log_writer = QueryLogWriter()
+
+
+def submit_query_log(query_log: QueryLog, chunk_ids: List) -> None:
+    """Queue a QueryLog for the background writer"""
+    _query_log_writer.submit(query_log, chunk_ids)
+
+
+def flush_query_logs() -> None:
+    """Wait for queued query logs to reach the database"""
+    _query_log_writer.flush()
@@ -12,29 +12,143 @@ This module handles:
 
 import os
 import time
+import hashlib
 import json
 import logging
+import queue
 import asyncio
-from typing import List, Dict, Tuple, Optional, Any
-from dataclasses import dataclass
+import threading
+import uuid
+from concurrent.futures import Future
+from typing import Callable, Iterator, List, Dict, Tuple, Optional, Any
+from dataclasses import dataclass, replace
 from decimal import Decimal
 
 import numpy as np
 import requests
 from sentence_transformers import SentenceTransformer
+from asgiref.sync import sync_to_async
 from django.conf import settings
-from django.db import transaction
+from django.core.cache import cache
+from django.db import connection, transaction
 from django.db.models import QuerySet
 from django.contrib.auth.models import User
-from pgvector.django import CosineDistance
+from pgvector import HalfVector
+from pgvector.django import MaxInnerProduct
 
+from .embedding_utils import get_sentence_transformer
 from .models import DocumentChunk, QueryLog, Embedding, SystemSettings
 from .openrouter_client import get_openrouter_client
-from .conversation_handler import ConversationHandler
+from .query_log_writer import submit_query_log
+from .signals import RAG_CONFIG_CACHE_KEY, corpus_version_key
+from .conversation_handler import get_conversation_handler
+from .json_utils import dumps_json
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+RAG_CONFIG_CACHE_TIMEOUT = 60  # seconds
+
+# Static instruction block for create_prompt; only context and query vary
+PROMPT_TEMPLATE = """You are a helpful AI assistant that answers questions based on the provided context. Follow these guidelines:
+
+1. Answer the question using ONLY the information provided in the context
+2. If the context doesn't contain enough information to answer the question, say so clearly
+3. Cite specific parts of the context when possible
+4. Be concise but comprehensive
+5. If multiple documents are referenced, mention which document provides each piece of information
+
+Context:
+{context}
+
+Question: {query}
+
+Answer:"""
+
+# Query embeddings are cached as raw float16 bytes (~1.5KB for a 768-d model),
+# the same precision as the halfvec column they're compared against
+QUERY_EMBEDDING_CACHE_TIMEOUT = 24 * 60 * 60  # seconds
+
+
+def _query_embedding_cache_key(model_name: str, query: str) -> str:
+    """Cache key for a query embedding; hashed so it's safe for memcached"""
+    return f"qemb:fp16:{model_name}:{hashlib.sha1(query.encode('utf-8')).hexdigest()}"
+
+
+# Concurrent query encodes arriving within this window share one forward pass
+EMBED_BATCH_WINDOW = 0.005  # seconds
+EMBED_MAX_BATCH = 32
+
+
+class QueryEmbeddingBatcher:
+    """
+    Coalesces concurrent generate_query_embedding calls into batched
+    encode() calls on a single worker thread
+    
+    Callers block on a Future until their batch has been encoded. A lone
+    request waits at most EMBED_BATCH_WINDOW for company.
+    """
+    
+    def __init__(self, model: SentenceTransformer, max_batch: int = EMBED_MAX_BATCH,
+                 window: float = EMBED_BATCH_WINDOW):
+        self.model = model
+        self.max_batch = max_batch
+        self.window = window
+        self._queue: queue.Queue = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name='query-embedding-batcher', daemon=True)
+        self._worker.start()
+    
+    def encode(self, text: str) -> np.ndarray:
+        """Encode one query, batched with any others waiting"""
+        future: Future = Future()
+        self._queue.put((text, future))
+        return future.result()
+    
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            
+            try:
+                embeddings = self.model.encode(
+                    [text for text, _ in batch],
+                    batch_size=self.max_batch,
+                    convert_to_numpy=True,
+                    normalize_embeddings=True,
+                )
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            
+            if len(batch) > 1:
+                logger.debug(f"Encoded {len(batch)} coalesced queries in one batch")
+            for (_, future), embedding in zip(batch, embeddings):
+                future.set_result(embedding)
+
+
+_query_batchers: Dict[str, QueryEmbeddingBatcher] = {}
+_query_batchers_lock = threading.Lock()
+
+
+def _get_query_batcher(model_name: str, load_model: Callable[[], SentenceTransformer]) -> QueryEmbeddingBatcher:
+    """Return the process-wide batcher for a model, creating it on first use"""
+    batcher = _query_batchers.get(model_name)
+    if batcher is None:
+        with _query_batchers_lock:
+            batcher = _query_batchers.get(model_name)
+            if batcher is None:
+                batcher = _query_batchers[model_name] = QueryEmbeddingBatcher(load_model())
+    return batcher
+
 
 @dataclass
 class RAGConfig:
@@ -47,10 +161,25 @@ class RAGConfig:
     temperature: float = 0.7
     max_tokens: int = 1000
     include_metadata: bool = True
+    vector_index_type: str = 'hnsw'  # 'hnsw' or 'ivfflat'
+    hnsw_ef_search: int = 100
+    ivfflat_probes: int = 10
+    semantic_cache_threshold: float = 0.97  # > 1.0 disables the response cache
+    binary_rerank_factor: int = 0  # > 0: fetch max_chunks * N binary-quantized candidates, rerank by cosine
     
     @classmethod
     def from_settings(cls) -> 'RAGConfig':
-        """Load configuration from SystemSettings"""
+        """
+        Load configuration from SystemSettings
+        
+        The result is cached for RAG_CONFIG_CACHE_TIMEOUT seconds; saving or
+        deleting a SystemSettings row invalidates it (see signals.py).
+        """
+        return cache.get_or_set(RAG_CONFIG_CACHE_KEY, cls._load_from_settings, RAG_CONFIG_CACHE_TIMEOUT)
+    
+    @classmethod
+    def _load_from_settings(cls) -> 'RAGConfig':
+        """Build configuration from SystemSettings with a single query"""
         config = cls()
         
         settings_map = {
@@ -62,39 +191,76 @@ class RAGConfig:
             'rag_temperature': 'temperature',
             'rag_max_tokens': 'max_tokens',
             'rag_include_metadata': 'include_metadata',
+            'rag_vector_index_type': 'vector_index_type',
+            'rag_hnsw_ef_search': 'hnsw_ef_search',
+            'rag_ivfflat_probes': 'ivfflat_probes',
+            'rag_semantic_cache_threshold': 'semantic_cache_threshold',
+            'rag_binary_rerank_factor': 'binary_rerank_factor',
         }
         
+        rows = SystemSettings.objects.filter(key__in=settings_map).in_bulk(field_name='key')
+        
         for setting_key, config_attr in settings_map.items():
-            try:
-                setting = SystemSettings.objects.get(key=setting_key)
-                value = setting.value
-                
-                # Enhanced type conversion with error handling
-                try:
-                    if setting.value_type == 'float' or config_attr in ['similarity_threshold', 'temperature']:
-                        value = float(value)
-                    elif setting.value_type == 'integer' or config_attr in ['max_chunks', 'max_context_length', 'max_tokens']:
-                        value = int(value)
-                    elif setting.value_type == 'boolean' or config_attr == 'include_metadata':
-                        value = value.lower() in ('true', '1', 'yes', 'on')
-                    # Keep string values as-is for model names
-                except (ValueError, TypeError) as e:
-                    logger.warning(f"Type conversion failed for {setting_key}={value}: {e}. Using default.")
-                    continue
-                
-                setattr(config, config_attr, value)
-                logger.debug(f"Loaded setting {setting_key}={value} (type: {type(value).__name__})")
-            except SystemSettings.DoesNotExist:
+            setting = rows.get(setting_key)
+            if setting is None:
                 logger.info(f"Setting {setting_key} not found, using default")
                 continue
+            value = setting.value
+            
+            # Enhanced type conversion with error handling
+            try:
+                if setting.value_type == 'float' or config_attr in ['similarity_threshold', 'temperature', 'semantic_cache_threshold']:
+                    value = float(value)
+                elif setting.value_type == 'integer' or config_attr in ['max_chunks', 'max_context_length', 'max_tokens', 'hnsw_ef_search', 'ivfflat_probes', 'binary_rerank_factor']:
+                    value = int(value)
+                elif setting.value_type == 'boolean' or config_attr == 'include_metadata':
+                    value = value.lower() in ('true', '1', 'yes', 'on')
+                # Keep string values as-is for model names
+            except (ValueError, TypeError) as e:
+                logger.warning(f"Type conversion failed for {setting_key}={value}: {e}. Using default.")
+                continue
+            
+            setattr(config, config_attr, value)
+            logger.debug(f"Loaded setting {setting_key}={value} (type: {type(value).__name__})")
         
         return config
 
 
+@dataclass(slots=True)
+class DocumentRef:
+    """The Document fields a search result needs, without a model instance"""
+    id: Any
+    title: str
+    file_name: str
+
+
+@dataclass(slots=True)
+class ChunkRef:
+    """
+    Read-only stand-in for a DocumentChunk returned by search; exposes the
+    same attribute names so templates and callers can use it unchanged
+    """
+    id: Any
+    content: str
+    chunk_index: int
+    start_char: int
+    end_char: int
+    word_count: int
+    display_header: str
+    document: DocumentRef
+
+
+# Columns search_similar_chunks reads, in ChunkRef/DocumentRef order
+SEARCH_RESULT_FIELDS = (
+    'id', 'content', 'chunk_index', 'start_char', 'end_char', 'word_count', 'display_header',
+    'document__id', 'document__title', 'document__file_name',
+)
+
+
 @dataclass
 class SearchResult:
     """Represents a search result with similarity score"""
-    chunk: DocumentChunk
+    chunk: ChunkRef
     similarity_score: float
     rank: int
     
@@ -127,6 +293,7 @@ class RAGResponse:
     prompt_tokens: int = 0
     completion_tokens: int = 0
     total_cost: Decimal = Decimal('0.0')
+    cached: bool = False
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary for JSON serialization"""
@@ -142,7 +309,97 @@ class RAGResponse:
             'prompt_tokens': self.prompt_tokens,
             'completion_tokens': self.completion_tokens,
             'total_cost': float(self.total_cost),
+            'cached': self.cached,
         }
+    
+    def to_json_bytes(self) -> bytes:
+        """Serialize to_dict() as compact JSON (orjson when available)"""
+        return dumps_json(self.to_dict())
+
+
+@dataclass
+class _PreparedQuery:
+    """State carried from retrieval to response building around the LLM call"""
+    query_text: str
+    query_embedding: np.ndarray
+    cache_scope: tuple
+    search_results: List[SearchResult]
+    search_time: float
+    prompt: str
+
+
+class SemanticResponseCache:
+    """
+    In-process cache of recent RAG responses, looked up by query embedding
+    similarity instead of exact query text
+    
+    Entries are partitioned by a scope tuple (user, corpus version, documents,
+    models, search settings) so a hit can only return an answer built from
+    the same inputs. Entries also expire after ttl seconds, which bounds
+    staleness where a corpus change wasn't seen (e.g. another process).
+    """
+    
+    def __init__(self, capacity: int = 512, ttl: float = 300.0):
+        self.capacity = capacity
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._vectors: Optional[np.ndarray] = None  # [capacity, dim], unit rows
+        self._scopes: List[Optional[tuple]] = [None] * capacity
+        self._responses: List[Optional[RAGResponse]] = [None] * capacity
+        self._last_used = np.zeros(capacity, dtype=np.int64)
+        self._stored_at = np.zeros(capacity, dtype=np.float64)  # time.monotonic()
+        self._clock = 0
+    
+    @staticmethod
+    def _normalize(embedding: np.ndarray) -> Optional[np.ndarray]:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else None
+    
+    def get(self, embedding: np.ndarray, scope: tuple, threshold: float) -> Optional[RAGResponse]:
+        """Return the cached response most similar to the query, if above threshold"""
+        vector = self._normalize(embedding)
+        with self._lock:
+            if vector is None or self._vectors is None or self._vectors.shape[1] != vector.shape[0]:
+                return None
+            
+            in_scope = np.fromiter((s == scope for s in self._scopes), dtype=bool, count=self.capacity)
+            in_scope &= self._stored_at > time.monotonic() - self.ttl
+            if not in_scope.any():
+                return None
+            
+            sims = np.where(in_scope, self._vectors @ vector, -np.inf)
+            best = int(np.argmax(sims))
+            if sims[best] < threshold:
+                return None
+            
+            self._clock += 1
+            self._last_used[best] = self._clock
+            return self._responses[best]
+    
+    def put(self, embedding: np.ndarray, scope: tuple, response: RAGResponse) -> None:
+        """Store a response, evicting the least recently used entry when full"""
+        vector = self._normalize(embedding)
+        if vector is None:
+            return
+        with self._lock:
+            if self._vectors is None or self._vectors.shape[1] != vector.shape[0]:
+                self._vectors = np.zeros((self.capacity, vector.shape[0]), dtype=np.float32)
+                self._scopes = [None] * self.capacity
+                self._responses = [None] * self.capacity
+                self._last_used[:] = 0
+            
+            slot = int(np.argmin(self._last_used))
+            self._clock += 1
+            self._vectors[slot] = vector
+            self._scopes[slot] = scope
+            self._responses[slot] = response
+            self._last_used[slot] = self._clock
+            self._stored_at[slot] = time.monotonic()
+
+
+# Shared by every engine in the process; engines are created per request
+_semantic_cache = SemanticResponseCache()
 
 
 class RAGQueryEngine:
@@ -153,34 +410,40 @@ class RAGQueryEngine:
     def __init__(self, config: Optional[RAGConfig] = None):
         """Initialize the RAG engine with configuration"""
         self.config = config or RAGConfig.from_settings()
-        self._embedding_model = None
         self._openrouter_client = get_openrouter_client()
-        self._conversation_handler = ConversationHandler()
+        self._conversation_handler = get_conversation_handler()
         
         if not self._openrouter_client.api_key:
             logger.warning("OPENROUTER_API_KEY not found in environment variables")
     
     @property
     def embedding_model(self) -> SentenceTransformer:
-        """Lazy loading of embedding model"""
-        if self._embedding_model is None:
-            logger.info(f"Loading embedding model: {self.config.embedding_model}")
-            self._embedding_model = SentenceTransformer(self.config.embedding_model)
-        return self._embedding_model
+        """Lazily loaded embedding model, shared by all engines in the process"""
+        return get_sentence_transformer(self.config.embedding_model)
     
     def generate_query_embedding(self, query: str) -> np.ndarray:
         """Generate embedding vector for user query"""
-        start_time = time.time()
+        start_time = time.perf_counter()
         
         # Preprocess query
         query = query.strip()
         if not query:
             raise ValueError("Query cannot be empty")
         
-        # Generate embedding
-        embedding = self.embedding_model.encode([query])[0]
+        # Repeated questions skip the transformer forward pass
+        cache_key = _query_embedding_cache_key(self.config.embedding_model, query)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            embedding = np.frombuffer(cached, dtype=np.float16)
+            logger.debug("Query embedding served from cache")
+            return embedding
+        
+        # Generate embedding, coalesced with any concurrent queries
+        batcher = _get_query_batcher(self.config.embedding_model, lambda: self.embedding_model)
+        embedding = batcher.encode(query).astype(np.float16)
+        cache.set(cache_key, embedding.tobytes(), QUERY_EMBEDDING_CACHE_TIMEOUT)
         
-        processing_time = time.time() - start_time
+        processing_time = time.perf_counter() - start_time
         logger.debug(f"Query embedding generated in {processing_time:.3f}s")
         
         return embedding
@@ -202,49 +465,79 @@ class RAGQueryEngine:
         Returns:
             List of SearchResult objects ordered by similarity
         """
-        start_time = time.time()
+        start_time = time.perf_counter()
         
         # Build query
-        chunks_query = DocumentChunk.objects.select_related('document').filter(
+        chunks_query = DocumentChunk.objects.filter(
             embedding__isnull=False  # Only chunks with embeddings
         )
         
+        candidates_query = Embedding.objects.all()
+        
         # Filter by user if provided
         if user:
             chunks_query = chunks_query.filter(document__uploaded_by=user)
+            candidates_query = candidates_query.filter(chunk__document__uploaded_by=user)
         
         # Filter by specific documents if provided
         if document_ids:
             chunks_query = chunks_query.filter(document__id__in=document_ids)
+            candidates_query = candidates_query.filter(chunk__document__id__in=document_ids)
         
         # Perform similarity search using pgvector
         # Ensure similarity_threshold is a float for calculation
         threshold = float(self.config.similarity_threshold) if isinstance(self.config.similarity_threshold, str) else self.config.similarity_threshold
-        distance_threshold = 1.0 - threshold  # Convert similarity to distance
+        # Stored and query vectors are unit length, so <#> (negative inner
+        # product) is -cosine similarity without the per-row norm computation
+        distance_threshold = -threshold
         
-        similar_chunks = chunks_query.annotate(
-            similarity=CosineDistance('embedding__vector', query_embedding)
-        ).filter(
-            similarity__lt=distance_threshold
-        ).order_by('similarity')[:self.config.max_chunks * 2]  # Get extra for filtering
+        result_limit = self.config.max_chunks
+        candidate_limit = self.config.max_chunks * self.config.binary_rerank_factor
         
-        # Convert to SearchResult objects with similarity scores
-        results = []
-        for rank, chunk in enumerate(similar_chunks, 1):
-            similarity_score = 1.0 - chunk.similarity  # Convert distance back to similarity
+        # SET LOCAL only lasts for the enclosing transaction, so the index
+        # search breadth is scoped to this search
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                if self.config.vector_index_type == 'ivfflat':
+                    cursor.execute("SET LOCAL ivfflat.probes = %s", [int(self.config.ivfflat_probes)])
+                else:
+                    # An HNSW scan returns at most ef_search rows, so a LIMIT above
+                    # it silently truncates the results
+                    ef_search = max(int(self.config.hnsw_ef_search), result_limit, candidate_limit)
+                    cursor.execute("SET LOCAL hnsw.ef_search = %s", [ef_search])
             
-            result = SearchResult(
-                chunk=chunk,
-                similarity_score=similarity_score,
+            # Two-stage search: cheap Hamming candidates from the binary index,
+            # then the exact halfvec cosine ranking over just those rows
+            if candidate_limit > 0:
+                candidate_ids = list(
+                    candidates_query.binary_nearest(
+                        query_embedding, candidate_limit
+                    ).values_list('chunk_id', flat=True)
+                )
+                chunks_query = chunks_query.filter(id__in=candidate_ids)
+            
+            # Only ORDER BY + LIMIT go to SQL so the index scan carries no extra
+            # predicate; plain tuples skip model instantiation for the chunk and its document
+            rows = list(chunks_query.annotate(
+                distance=MaxInnerProduct('embedding__vector', HalfVector(query_embedding))
+            ).order_by('distance').values_list(*SEARCH_RESULT_FIELDS, 'distance')[:result_limit])
+        
+        # Apply the similarity threshold as one vectorized compare
+        distances = np.fromiter((row[-1] for row in rows), dtype=np.float64, count=len(rows))
+        keep = (distances < distance_threshold).tolist()
+        rows = [row for row, kept in zip(rows, keep) if kept]
+        
+        # Convert to SearchResult objects with similarity scores
+        results = [
+            SearchResult(
+                chunk=ChunkRef(*row[:7], DocumentRef(*row[7:10])),
+                similarity_score=-row[10],  # Convert distance back to similarity
                 rank=rank
             )
-            results.append(result)
-            
-            # Stop when we have enough chunks
-            if len(results) >= self.config.max_chunks:
-                break
+            for rank, row in enumerate(rows, 1)
+        ]
         
-        search_time = time.time() - start_time
+        search_time = time.perf_counter() - start_time
         logger.info(f"Found {len(results)} relevant chunks in {search_time:.3f}s")
         
         return results
@@ -262,27 +555,23 @@ class RAGQueryEngine:
         if not search_results:
             return "No relevant context found."
         
-        context_parts = []
-        current_length = 0
+        if self.config.include_metadata:
+            # display_header is precomputed at ingest; older rows may not have it
+            context_parts = [
+                f"{result.chunk.display_header or DocumentChunk.format_header(result.chunk.document.title)}"
+                f"[Similarity: {result.similarity_score:.3f}]\n"
+                f"{result.chunk.content}\n"
+                for result in search_results
+            ]
+        else:
+            context_parts = [f"{result.chunk.content}\n" for result in search_results]
         
-        for result in search_results:
-            # Format chunk with metadata if enabled
-            if self.config.include_metadata:
-                chunk_text = (
-                    f"[Document: {result.chunk.document.title}] "
-                    f"[Similarity: {result.similarity_score:.3f}]\n"
-                    f"{result.chunk.content}\n"
-                )
-            else:
-                chunk_text = f"{result.chunk.content}\n"
-            
-            # Check if adding this chunk would exceed context limit
-            if current_length + len(chunk_text) > self.config.max_context_length:
-                logger.info(f"Context limit reached, using {len(context_parts)} chunks")
-                break
-            
-            context_parts.append(chunk_text)
-            current_length += len(chunk_text)
+        # Keep the longest prefix of chunks that fits the context limit
+        lengths = np.fromiter(map(len, context_parts), dtype=np.int64, count=len(context_parts))
+        cutoff = int(np.searchsorted(np.cumsum(lengths), self.config.max_context_length, side='right'))
+        if cutoff < len(context_parts):
+            logger.info(f"Context limit reached, using {cutoff} chunks")
+            context_parts = context_parts[:cutoff]
         
         return "\n---\n".join(context_parts)
     
@@ -297,26 +586,11 @@ class RAGQueryEngine:
         Returns:
             Formatted prompt string
         """
-        prompt = f"""You are a helpful AI assistant that answers questions based on the provided context. Follow these guidelines:
-
-1. Answer the question using ONLY the information provided in the context
-2. If the context doesn't contain enough information to answer the question, say so clearly
-3. Cite specific parts of the context when possible
-4. Be concise but comprehensive
-5. If multiple documents are referenced, mention which document provides each piece of information
-
-Context:
-{context}
-
-Question: {query}
-
-Answer:"""
-        
-        return prompt
+        return PROMPT_TEMPLATE.format_map({'context': context, 'query': query})
     
-    async def generate_llm_response(self, prompt: str) -> Tuple[str, Dict[str, Any]]:
+    def _call_llm(self, prompt: str) -> Tuple[str, Dict[str, Any]]:
         """
-        Generate response using OpenRouter API via the client
+        Generate response using OpenRouter API via the client (blocking)
         
         Args:
             prompt: Formatted prompt for the LLM
@@ -327,12 +601,11 @@ Answer:"""
         if not self._openrouter_client.api_key:
             raise ValueError("OPENROUTER_API_KEY not configured")
         
-        start_time = time.time()
+        start_time = time.perf_counter()
         
         try:
             # Use the OpenRouter client for chat completion
             messages = [{"role": "user", "content": prompt}]
-            
             result = self._openrouter_client.chat_completion(
                 messages=messages,
                 model=self.config.llm_model,
@@ -342,14 +615,58 @@ Answer:"""
             
             # Extract response and usage information
             response_text = result['choices'][0]['message']['content']
-            usage = result.get('usage', {})
+            metadata = self._llm_metadata(result.get('usage', {}), time.perf_counter() - start_time)
             
-            # Calculate cost (example rates - adjust based on actual pricing)
-            prompt_tokens = usage.get('prompt_tokens', 0)
-            completion_tokens = usage.get('completion_tokens', 0)
+            logger.info(f"LLM response generated in {metadata['llm_time']:.3f}s using {self.config.llm_model}")
+            return response_text, metadata
             
-            # Cost calculation would need actual model pricing
-            # This is a placeholder calculation
+        except Exception as e:
+            logger.error(f"LLM generation failed: {e}")
+            raise
+    
+    async def generate_llm_response(self, prompt: str) -> Tuple[str, Dict[str, Any]]:
+        """
+        Async wrapper around _call_llm for aquery()
+        
+        The blocking HTTP call runs in a worker thread so concurrent aquery()
+        calls overlap their round-trips.
+        """
+        return await asyncio.to_thread(self._call_llm, prompt)
+    
+    def stream_llm_response(self, prompt: str, usage: Dict[str, Any]) -> Iterator[str]:
+        """
+        Stream the LLM response for a prompt as text deltas
+        
+        Args:
+            prompt: Formatted prompt for the LLM
+            usage: Dict filled with the token usage reported at the end of the stream
+        
+        Yields:
+            Response text deltas as they arrive
+        """
+        if not self._openrouter_client.api_key:
+            raise ValueError("OPENROUTER_API_KEY not configured")
+        
+        messages = [{"role": "user", "content": prompt}]
+        yield from self._openrouter_client.chat_completion_stream(
+            messages=messages,
+            model=self.config.llm_model,
+            temperature=self.config.temperature,
+            max_tokens=self.config.max_tokens,
+            usage=usage,
+        )
+    
+    def _llm_metadata(self, usage: Dict[str, Any], llm_time: float) -> Dict[str, Any]:
+        """Token counts, cost and timing for an LLM call from its usage block"""
+        prompt_tokens = usage.get('prompt_tokens', 0)
+        completion_tokens = usage.get('completion_tokens', 0)
+        
+        # Price by model id from the prebuilt table (never fetches the model list)
+        model_table = self._openrouter_client.get_model_table()
+        if self.config.llm_model in model_table.index:
+            total_cost = Decimal(str(model_table.cost(self.config.llm_model, prompt_tokens, completion_tokens)))
+        else:
+            # Model not in the fetched list: fall back to example rates
             cost_per_1k_prompt = Decimal('0.003')  # Example rate
             cost_per_1k_completion = Decimal('0.015')  # Example rate
             
@@ -357,23 +674,14 @@ Answer:"""
                 (Decimal(prompt_tokens) / 1000) * cost_per_1k_prompt +
                 (Decimal(completion_tokens) / 1000) * cost_per_1k_completion
             )
-            
-            llm_time = time.time() - start_time
-            
-            metadata = {
-                'prompt_tokens': prompt_tokens,
-                'completion_tokens': completion_tokens,
-                'total_cost': total_cost,
-                'llm_time': llm_time,
-                'model': self.config.llm_model,
-            }
-            
-            logger.info(f"LLM response generated in {llm_time:.3f}s using {self.config.llm_model}")
-            return response_text, metadata
-            
-        except Exception as e:
-            logger.error(f"LLM generation failed: {e}")
-            raise
+        
+        return {
+            'prompt_tokens': prompt_tokens,
+            'completion_tokens': completion_tokens,
+            'total_cost': total_cost,
+            'llm_time': llm_time,
+            'model': self.config.llm_model,
+        }
     
     def query(
         self, 
@@ -394,8 +702,111 @@ Answer:"""
         Returns:
             RAGResponse object with complete response and metadata
         """
-        total_start_time = time.time()
+        total_start_time = time.perf_counter()
+        
+        response, prepared = self._prepare_query(query_text, user, document_ids, session_id, total_start_time)
+        if response is not None:
+            return response
+        
+        # 5. Generate LLM response
+        try:
+            llm_result = self._call_llm(prepared.prompt)
+        except Exception as e:
+            llm_result = e
+        
+        return self._finish_query(prepared, llm_result, user, session_id, total_start_time)
+    
+    def stream_query(
+        self, 
+        query_text: str, 
+        user: Optional[User] = None,
+        document_ids: Optional[List[str]] = None,
+        session_id: Optional[str] = None
+    ) -> Iterator[Tuple[str, Any]]:
+        """
+        Streaming variant of query()
+        
+        Yields:
+            ('delta', text) for each piece of the answer as the LLM produces it,
+            then ('response', RAGResponse) once it is complete and logged.
+            Answers that need no LLM call yield only the final response.
+        """
+        total_start_time = time.perf_counter()
+        
+        response, prepared = self._prepare_query(query_text, user, document_ids, session_id, total_start_time)
+        if response is not None:
+            yield 'response', response
+            return
+        
+        # 5. Stream LLM response
+        start_time = time.perf_counter()
+        usage: Dict[str, Any] = {}
+        parts = []
+        try:
+            for delta in self.stream_llm_response(prepared.prompt, usage):
+                parts.append(delta)
+                yield 'delta', delta
+            llm_result = (''.join(parts), self._llm_metadata(usage, time.perf_counter() - start_time))
+        except Exception as e:
+            llm_result = e
+        
+        yield 'response', self._finish_query(prepared, llm_result, user, session_id, total_start_time)
+    
+    async def aquery(
+        self, 
+        query_text: str, 
+        user: Optional[User] = None,
+        document_ids: Optional[List[str]] = None,
+        session_id: Optional[str] = None
+    ) -> RAGResponse:
+        """
+        Async variant of query() for use from async code
+        
+        The database stages run via sync_to_async; the LLM call is awaited
+        directly, so several aquery() calls overlap their LLM round-trips.
+        """
+        total_start_time = time.perf_counter()
+        
+        response, prepared = await sync_to_async(self._prepare_query)(
+            query_text, user, document_ids, session_id, total_start_time
+        )
+        if response is not None:
+            return response
+        
+        # 5. Generate LLM response
+        try:
+            llm_result = await self.generate_llm_response(prepared.prompt)
+        except Exception as e:
+            llm_result = e
+        
+        return await sync_to_async(self._finish_query)(
+            prepared, llm_result, user, session_id, total_start_time
+        )
+    
+    async def aquery_many(self, queries: List[str], user: Optional[User] = None) -> List[RAGResponse]:
+        """
+        Run several queries concurrently (e.g. evaluation runs)
+        
+        Returns:
+            RAGResponse objects in the same order as queries
+        """
+        return await asyncio.gather(*(self.aquery(query_text, user=user) for query_text in queries))
+    
+    def _prepare_query(
+        self,
+        query_text: str,
+        user: Optional[User],
+        document_ids: Optional[List[str]],
+        session_id: Optional[str],
+        total_start_time: float
+    ) -> Tuple[Optional[RAGResponse], Optional[_PreparedQuery]]:
+        """
+        Steps 1-4 of a query: embed, search, assemble context, build the prompt
         
+        Returns:
+            (response, None) when the query was answered without the LLM
+            (conversational, cached, no results or error), else (None, prepared)
+        """
         # Check if this is a conversational query first
         conversational_response = self._conversation_handler.handle_conversational_query(query_text, user)
         if conversational_response:
@@ -406,23 +817,45 @@ Answer:"""
                 total_chunks_found=0,
                 search_time=0.0,
                 llm_time=0.0,
-                total_time=time.time() - total_start_time,
+                total_time=time.perf_counter() - total_start_time,
                 llm_model=self.config.llm_model,
             )
             self._log_query(query_text, response, user, session_id)
-            return response
+            return response, None
         
         try:
             # 1. Generate query embedding
             logger.info(f"Processing query: {query_text[:100]}...")
             query_embedding = self.generate_query_embedding(query_text)
             
+            # Near-identical earlier question with the same scope: skip search and LLM
+            cache_scope = self._semantic_cache_scope(user, document_ids)
+            if self.config.semantic_cache_threshold <= 1.0:
+                cached_response = _semantic_cache.get(
+                    query_embedding, cache_scope, self.config.semantic_cache_threshold
+                )
+                if cached_response is not None:
+                    response = replace(
+                        cached_response,
+                        query=query_text,
+                        search_time=0.0,
+                        llm_time=0.0,
+                        total_time=time.perf_counter() - total_start_time,
+                        prompt_tokens=0,
+                        completion_tokens=0,
+                        total_cost=Decimal('0.0'),
+                        cached=True,
+                    )
+                    self._log_query(query_text, response, user, session_id)
+                    logger.info(f"Semantic cache hit, query completed in {response.total_time:.3f}s")
+                    return response, None
+            
             # 2. Search for similar chunks
-            search_start_time = time.time()
+            search_start_time = time.perf_counter()
             search_results = self.search_similar_chunks(
                 query_embedding, user, document_ids
             )
-            search_time = time.time() - search_start_time
+            search_time = time.perf_counter() - search_start_time
             
             if not search_results:
                 # No relevant chunks found
@@ -433,13 +866,13 @@ Answer:"""
                     total_chunks_found=0,
                     search_time=search_time,
                     llm_time=0.0,
-                    total_time=time.time() - total_start_time,
+                    total_time=time.perf_counter() - total_start_time,
                     llm_model=self.config.llm_model,
                 )
                 
                 # Log the query
                 self._log_query(query_text, response, user, session_id)
-                return response
+                return response, None
             
             # 3. Assemble context
             context = self.assemble_context(search_results)
@@ -447,19 +880,38 @@ Answer:"""
             # 4. Create prompt
             prompt = self.create_prompt(query_text, context)
             
-            # 5. Generate LLM response
-            try:
-                # Note: Making this synchronous for now - can be made async later
-                import asyncio
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                response_text, llm_metadata = loop.run_until_complete(
-                    self.generate_llm_response(prompt)
-                )
-                loop.close()
-            except Exception as e:
-                logger.error(f"LLM generation failed: {e}")
-                response_text = f"I found relevant information but encountered an error generating the response. Please try again. Error: {str(e)}"
+            return None, _PreparedQuery(
+                query_text=query_text,
+                query_embedding=query_embedding,
+                cache_scope=cache_scope,
+                search_results=search_results,
+                search_time=search_time,
+                prompt=prompt,
+            )
+            
+        except Exception as e:
+            return self._error_response(query_text, e, user, session_id, total_start_time), None
+    
+    def _finish_query(
+        self,
+        prepared: _PreparedQuery,
+        llm_result: Any,
+        user: Optional[User],
+        session_id: Optional[str],
+        total_start_time: float
+    ) -> RAGResponse:
+        """
+        Steps 6-7 of a query: build, cache and log the response
+        
+        Args:
+            llm_result: (response_text, usage_metadata) from _call_llm,
+                or the exception it raised
+        """
+        query_text = prepared.query_text
+        try:
+            if isinstance(llm_result, Exception):
+                logger.error(f"LLM generation failed: {llm_result}")
+                response_text = f"I found relevant information but encountered an error generating the response. Please try again. Error: {str(llm_result)}"
                 llm_metadata = {
                     'prompt_tokens': 0,
                     'completion_tokens': 0,
@@ -467,16 +919,18 @@ Answer:"""
                     'llm_time': 0.0,
                     'model': self.config.llm_model,
                 }
+            else:
+                response_text, llm_metadata = llm_result
             
             # 6. Create response object
-            total_time = time.time() - total_start_time
+            total_time = time.perf_counter() - total_start_time
             
             response = RAGResponse(
                 query=query_text,
                 response=response_text,
-                source_chunks=search_results,
-                total_chunks_found=len(search_results),
-                search_time=search_time,
+                source_chunks=prepared.search_results,
+                total_chunks_found=len(prepared.search_results),
+                search_time=prepared.search_time,
                 llm_time=llm_metadata['llm_time'],
                 total_time=total_time,
                 llm_model=llm_metadata['model'],
@@ -485,6 +939,10 @@ Answer:"""
                 total_cost=llm_metadata['total_cost'],
             )
             
+            # Only successful generations are worth serving again
+            if llm_metadata['completion_tokens'] and self.config.semantic_cache_threshold <= 1.0:
+                _semantic_cache.put(prepared.query_embedding, prepared.cache_scope, response)
+            
             # 7. Log the query
             self._log_query(query_text, response, user, session_id)
             
@@ -492,23 +950,56 @@ Answer:"""
             return response
             
         except Exception as e:
-            logger.error(f"Query processing failed: {e}")
-            
-            # Return error response
-            error_response = RAGResponse(
-                query=query_text,
-                response=f"An error occurred while processing your query: {str(e)}",
-                source_chunks=[],
-                total_chunks_found=0,
-                search_time=0.0,
-                llm_time=0.0,
-                total_time=time.time() - total_start_time,
-                llm_model=self.config.llm_model,
-            )
-            
-            # Log the failed query
-            self._log_query(query_text, error_response, user, session_id)
-            return error_response
+            return self._error_response(query_text, e, user, session_id, total_start_time)
+    
+    def _error_response(
+        self,
+        query_text: str,
+        error: Exception,
+        user: Optional[User],
+        session_id: Optional[str],
+        total_start_time: float
+    ) -> RAGResponse:
+        """Build and log the response returned when query processing fails"""
+        logger.error(f"Query processing failed: {error}")
+        
+        # Return error response
+        error_response = RAGResponse(
+            query=query_text,
+            response=f"An error occurred while processing your query: {str(error)}",
+            source_chunks=[],
+            total_chunks_found=0,
+            search_time=0.0,
+            llm_time=0.0,
+            total_time=time.perf_counter() - total_start_time,
+            llm_model=self.config.llm_model,
+        )
+        
+        # Log the failed query
+        self._log_query(query_text, error_response, user, session_id)
+        return error_response
+    
+    def _semantic_cache_scope(
+        self,
+        user: Optional[User],
+        document_ids: Optional[List[str]]
+    ) -> tuple:
+        """Everything besides the query that determines the response"""
+        user_id = user.pk if user else None
+        # Bumping the version (see signals) orphans every response cached for the user
+        corpus_version = cache.get_or_set(corpus_version_key(user_id), lambda: uuid.uuid4().hex, None)
+        return (
+            user_id,
+            corpus_version,
+            tuple(sorted(map(str, document_ids))) if document_ids else None,
+            self.config.embedding_model,
+            self.config.llm_model,
+            self.config.similarity_threshold,
+            self.config.max_chunks,
+            self.config.max_context_length,
+            self.config.temperature,
+            self.config.max_tokens,
+        )
     
     def _log_query(
         self, 
@@ -517,33 +1008,41 @@ Answer:"""
         user: Optional[User] = None,
         session_id: Optional[str] = None
     ) -> QueryLog:
-        """Log query and response to database"""
+        """
+        Log query and response to database
+        
+        The row is written in the background by the query log writer, so the
+        returned QueryLog may not be saved yet (see flush_query_logs).
+        """
         try:
-            with transaction.atomic():
-                query_log = QueryLog.objects.create(
-                    query_text=query_text,
-                    user=user,
-                    session_id=session_id or '',
-                    response_text=response.response,
-                    similarity_threshold=self.config.similarity_threshold,
-                    chunks_found=response.total_chunks_found,
-                    llm_model=response.llm_model,
-                    llm_provider='openrouter',
-                    prompt_tokens=response.prompt_tokens,
-                    completion_tokens=response.completion_tokens,
-                    total_cost=response.total_cost,
-                    search_time=response.search_time,
-                    llm_time=response.llm_time,
-                    total_time=response.total_time,
-                )
-                
-                # Add source chunks
-                if response.source_chunks:
-                    chunks = [result.chunk for result in response.source_chunks]
-                    query_log.source_chunks.set(chunks)
-                
-                logger.info(f"Query logged with ID: {query_log.id}")
-                return query_log
+            query_log = QueryLog(
+                query_text=query_text,
+                user=user,
+                session_id=session_id or '',
+                response_text=response.response,
+                similarity_threshold=self.config.similarity_threshold,
+                chunks_found=response.total_chunks_found,
+                llm_model=response.llm_model,
+                llm_provider='openrouter',
+                prompt_tokens=response.prompt_tokens,
+                completion_tokens=response.completion_tokens,
+                total_cost=response.total_cost,
+                search_time=response.search_time,
+                llm_time=response.llm_time,
+                total_time=response.total_time,
+            )
+            
+            # Source chunks are linked by primary key alone (no SELECT on the
+            # chunks); de-duplicated as source_chunks.set() would. A cached
+            # response's chunks may have been deleted since, so it links none.
+            if response.cached:
+                chunk_ids = []
+            else:
+                chunk_ids = list(dict.fromkeys(result.chunk.id for result in response.source_chunks))
+            submit_query_log(query_log, chunk_ids)
+            
+            logger.info(f"Query queued for logging with ID: {query_log.id}")
+            return query_log
                 
         except Exception as e:
             logger.error(f"Failed to log query: {e}")
@@ -552,6 +1051,20 @@ Answer:"""
 
 
 # Convenience function for quick queries
+def get_rag_engine(**overrides) -> RAGQueryEngine:
+    """
+    Engine for one request, with optional config overrides
+    (similarity_threshold, max_chunks, llm_model, ...); None values are ignored
+    
+    Creating an engine is cheap: the embedding model, OpenRouter client and
+    conversation handler are process-wide and the config comes from cache.
+    Overrides go into this engine's own config copy, so concurrent requests
+    never see each other's settings.
+    """
+    overrides = {name: value for name, value in overrides.items() if value is not None}
+    return RAGQueryEngine(replace(RAGConfig.from_settings(), **overrides))
+
+
 def quick_query(query_text: str, user: Optional[User] = None) -> RAGResponse:
     """
     Convenience function for quick RAG queries
@@ -563,5 +1076,5 @@ def quick_query(query_text: str, user: Optional[User] = None) -> RAGResponse:
     Returns:
         RAGResponse object
     """
-    engine = RAGQueryEngine()
+    engine = get_rag_engine()
     return engine.query(query_text, user=user)
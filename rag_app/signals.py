@@ -0,0 +1,53 @@
+"""
+Signal handlers for rag_app
+"""
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Document, SystemSettings
+
+# Cache entry holding the RAGConfig built from SystemSettings (see rag_engine)
+RAG_CONFIG_CACHE_KEY = 'rag_config'
+
+
+def document_count_version_key(user_id):
+    """Cache entry whose value is part of every cached document count for a user"""
+    return f'doccount_version:{user_id}'
+
+
+def document_status_cache_key(user_id, document_id):
+    """Cache entry for a document's status poll payload (see document_status_api)"""
+    return f'docstatus:{user_id}:{document_id}'
+
+
+def corpus_version_key(user_id):
+    """
+    Cache entry whose value is part of the semantic response cache scope for
+    a user's searches; user_id None covers searches across all documents
+    """
+    return f'corpus_version:{user_id}'
+
+
+def invalidate_corpus_versions(user_ids):
+    """Orphan cached responses built from these users' documents"""
+    cache.delete_many([corpus_version_key(None), *(corpus_version_key(user_id) for user_id in user_ids)])
+
+
+@receiver([post_save, post_delete], sender=SystemSettings)
+def invalidate_rag_config(sender, **kwargs):
+    """Drop the cached RAGConfig so the next engine sees the change"""
+    cache.delete(RAG_CONFIG_CACHE_KEY)
+
+
+@receiver([post_save, post_delete], sender=Document)
+def invalidate_document_caches(sender, instance, **kwargs):
+    """
+    Orphan the user's cached list counts and responses and drop the
+    document's cached status
+    """
+    cache.delete_many([
+        document_count_version_key(instance.uploaded_by_id),
+        document_status_cache_key(instance.uploaded_by_id, instance.pk),
+    ])
+    invalidate_corpus_versions([instance.uploaded_by_id])
@@ -24,6 +24,7 @@ urlpatterns = [
     # Chat interface
     path('chat/', chat_views.chat_interface, name='chat_interface'),
     path('chat/query/', chat_views.chat_query, name='chat_query'),
+    path('chat/query/stream/', chat_views.chat_query_stream, name='chat_query_stream'),
     
     # Model selection and management
     path('models/', model_views.model_selection, name='model_selection'),
@@ -1,29 +1,89 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
+from django.conf import settings
 from django.contrib import messages
-from django.http import JsonResponse, Http404
+from django.http import HttpResponse, JsonResponse, Http404
+from django.core.cache import cache
+from django.contrib.postgres.search import SearchQuery
 from django.core.paginator import Paginator
-from django.db.models import Q, Count
+from django.db import transaction
+from django.db.models import Count, Prefetch, Q
+from django.db.models.functions import Left
 from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_exempt
 from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.functional import cached_property
+from django.utils.http import quote_etag
+from dataclasses import dataclass, field
+import hashlib
 import json
-import threading
 import time
 import logging
+import os
+import uuid
 
-from .models import Document, DocumentChunk, Embedding, QueryLog
+from .models import (
+    DOCUMENT_SEARCH_CONFIG, Document, DocumentChunk, QueryLog, document_content_search_vector,
+)
 from .forms import DocumentUploadForm, QueryForm, DocumentSearchForm
 from .document_processor import get_document_processor
+from .document_tasks import submit_documents, submit_file_removal
+from .json_utils import OrjsonResponse, dumps_json
 from .embedding_utils import get_embedding_generator
-from .rag_engine import RAGQueryEngine, quick_query
+from .rag_engine import get_rag_engine, quick_query
 from .openrouter_client import get_openrouter_client
 from .conversation_handler import get_conversation_handler
+from .templatetags.rag_extras import split as split_tags
+from .signals import document_count_version_key, document_status_cache_key
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
 
+@dataclass(slots=True)
+class ConversationalResponse:
+    """Stand-in for a RAGResponse when query_results renders a conversational reply"""
+    response_text: str
+    query_text: str
+    sources: list = field(default_factory=list)
+    total_chunks_found: int = 0
+    search_time: float = 0.0
+    llm_time: float = 0.0
+    total_time: float = 0.0
+    is_conversational: bool = True
+
+
+# Seconds a document list COUNT is reused; saves and deletes invalidate it sooner
+DOCUMENT_COUNT_CACHE_TIMEOUT = 30
+# Seconds a status poll payload is reused; bounds staleness across processes
+DOCUMENT_STATUS_CACHE_TIMEOUT = 3
+
+
+class CachedCountPaginator(Paginator):
+    """
+    Paginator that caches COUNT(*) per user and filtered query, so paging
+    through the same list doesn't recount it on every request
+    """
+    
+    def __init__(self, object_list, per_page, user_id, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.user_id = user_id
+    
+    @cached_property
+    def count(self):
+        # Bumping the version (see signals) orphans every count cached for the user
+        version = cache.get_or_set(
+            document_count_version_key(self.user_id), lambda: uuid.uuid4().hex, None
+        )
+        query_hash = hashlib.sha1(str(self.object_list.query).encode('utf-8')).hexdigest()
+        return cache.get_or_set(
+            f'doccount:{self.user_id}:{version}:{query_hash}',
+            self.object_list.count,
+            DOCUMENT_COUNT_CACHE_TIMEOUT,
+        )
+
+
 def home_view(request):
     """
     Home page with upload form and recent documents
@@ -36,13 +96,16 @@ def home_view(request):
     # Get statistics
     stats = {}
     if request.user.is_authenticated:
-        stats = {
-            'total_documents': Document.objects.filter(uploaded_by=request.user).count(),
-            'processed_documents': Document.objects.filter(uploaded_by=request.user, status='processed').count(),
-            'processing_documents': Document.objects.filter(uploaded_by=request.user, status='processing').count(),
-            'total_chunks': DocumentChunk.objects.filter(document__uploaded_by=request.user).count(),
-            'total_embeddings': Embedding.objects.filter(chunk__document__uploaded_by=request.user).count(),
-        }
+        # One conditional aggregate per table instead of five COUNT queries
+        stats = Document.objects.filter(uploaded_by=request.user).aggregate(
+            total_documents=Count('id'),
+            processed_documents=Count('id', filter=Q(status='processed')),
+            processing_documents=Count('id', filter=Q(status='processing')),
+        )
+        stats.update(DocumentChunk.objects.filter(document__uploaded_by=request.user).aggregate(
+            total_chunks=Count('id'),
+            total_embeddings=Count('embedding'),
+        ))
     
     # Get OpenRouter models for selection
     available_models = []
@@ -111,17 +174,8 @@ def upload_document(request):
                         continue
                 
                 if uploaded_documents:
-                    # Start background processing for all documents
-                    def process_all_in_background():
-                        for document in uploaded_documents:
-                            try:
-                                processor.create_chunks_and_embeddings(document)
-                                logger.info(f"Background processing completed for document: {document.title}")
-                            except Exception as e:
-                                logger.error(f"Background processing failed for document {document.title}: {e}")
-                    
-                    # Start processing in background thread
-                    threading.Thread(target=process_all_in_background, daemon=True).start()
+                    # Queue chunking and embedding on the shared background pool
+                    submit_documents(uploaded_documents)
                     
                     if len(uploaded_documents) == 1:
                         messages.success(
@@ -165,38 +219,56 @@ def document_list(request):
         category = form.cleaned_data.get('category')
         
         if search:
-            documents = documents.filter(
+            # Full text goes through the GIN-indexed tsvector instead of a LIKE scan;
+            # the short name/tag columns keep substring matching
+            documents = documents.annotate(content_search=document_content_search_vector()).filter(
                 Q(title__icontains=search) |
-                Q(content__icontains=search) |
+                Q(content_search=SearchQuery(search, config=DOCUMENT_SEARCH_CONFIG)) |
                 Q(tags__icontains=search) |
                 Q(file_name__icontains=search)
             )
         
+        # Collect the column filters and apply them in one filter() call
+        filters = {}
         if file_type:
-            documents = documents.filter(file_type=file_type)
+            filters['file_type'] = file_type
         
         if status:
-            documents = documents.filter(status=status)
+            filters['status'] = status
         
         if category:
-            documents = documents.filter(category__icontains=category)
-    
-    # Add chunk counts
-    documents = documents.annotate(chunk_count_actual=Count('chunks'))
-    documents = documents.order_by('-uploaded_at')
+            filters['category__icontains'] = category
+        
+        if filters:
+            documents = documents.filter(**filters)
     
-    # Pagination
-    paginator = Paginator(documents, 10)
+    # Paginate over primary keys only, so COUNT and OFFSET never touch the
+    # chunks JOIN; pk breaks uploaded_at ties for a stable page order
+    page_ids_query = documents.order_by('-uploaded_at', '-pk').values_list('pk', flat=True)
+    paginator = CachedCountPaginator(page_ids_query, 10, request.user.id)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
+    page_ids = list(page_obj.object_list)
     
-    # Check if there are any processing documents for auto-refresh
-    has_processing_documents = documents.filter(status='processing').exists()
+    # Fetch just this page's rows with chunk counts. The list never shows the
+    # extracted text, so leave the (potentially multi-MB) content column out
+    page_documents = Document.objects.filter(pk__in=page_ids).defer('content').annotate(
+        chunk_count_actual=Count('chunks')
+    ).in_bulk()
+    page_documents = [page_documents[pk] for pk in page_ids]
+    page_obj.object_list = page_documents
+    
+    # Split tags once per document here rather than per cell in the template
+    for document in page_documents:
+        document.tag_list = split_tags(document.tags)
+    
+    # Auto-refresh only matters for documents visible on this page
+    has_processing_documents = any(document.status == 'processing' for document in page_documents)
     
     context = {
         'form': form,
         'page_obj': page_obj,
-        'documents': page_obj.object_list,
+        'documents': page_documents,
         'has_processing_documents': has_processing_documents,
     }
     
@@ -208,8 +280,17 @@ def document_detail(request, document_id):
     """
     Display document details with chunks
     """
-    document = get_object_or_404(Document, id=document_id, uploaded_by=request.user)
-    chunks = document.chunks.all().order_by('chunk_index')
+    # Load the ordered chunks once; the template's chunks.count/exists/all and
+    # the paginator below are all served from this prefetch
+    document = get_object_or_404(
+        Document.objects.prefetch_related(Prefetch(
+            'chunks',
+            queryset=DocumentChunk.objects.only('id', 'chunk_index', 'content', 'document_id').order_by('chunk_index'),
+        )),
+        id=document_id,
+        uploaded_by=request.user,
+    )
+    chunks = document.chunks.all()
     
     # Pagination for chunks
     paginator = Paginator(chunks, 5)
@@ -234,20 +315,20 @@ def delete_document(request, document_id):
     
     if request.method == 'POST':
         try:
-            # Delete file from disk
-            import os
-            from django.conf import settings
             file_path = os.path.join(settings.MEDIA_ROOT, document.file_path)
-            if os.path.exists(file_path):
-                os.remove(file_path)
-            
-            # Delete database record (cascades to chunks and embeddings)
             title = document.title
-            document.delete()
+            
+            with transaction.atomic():
+                # Chunks and embeddings go in bulk first, so the cascade has little left to collect
+                DocumentChunk.objects.filter(document=document).delete_in_db()
+                document.delete()
+                
+                # Remove the file only once the rows are really gone, off the request thread
+                transaction.on_commit(lambda: submit_file_removal(file_path))
             
             # Handle AJAX requests vs regular form submissions
             if request.headers.get('X-Requested-With') == 'XMLHttpRequest' or request.content_type == 'application/json':
-                return JsonResponse({
+                return OrjsonResponse({
                     'success': True,
                     'message': f"Document '{title}' deleted successfully.",
                     'redirect': reverse('document_list')
@@ -282,7 +363,7 @@ def reprocess_document(request, document_id):
     if request.method == 'POST':
         try:
             # Delete existing chunks and embeddings
-            document.chunks.all().delete()
+            DocumentChunk.objects.filter(document=document).delete_in_db()
             
             # Reset document status
             document.status = 'processing'
@@ -291,15 +372,7 @@ def reprocess_document(request, document_id):
             document.save()
             
             # Start background reprocessing
-            def reprocess_in_background():
-                try:
-                    processor = get_document_processor()
-                    processor.create_chunks_and_embeddings(document)
-                    print(f"Background reprocessing completed for document: {document.title}")
-                except Exception as e:
-                    print(f"Background reprocessing failed for document {document.title}: {e}")
-            
-            threading.Thread(target=reprocess_in_background, daemon=True).start()
+            submit_documents([document])
             
             messages.success(
                 request,
@@ -320,16 +393,29 @@ def document_status_api(request, document_id):
     API endpoint to check document processing status
     """
     try:
-        document = get_object_or_404(Document, id=document_id, uploaded_by=request.user)
-        
-        data = {
-            'status': document.status,
-            'chunk_count': document.chunk_count,
-            'processing_error': document.processing_error,
-            'processed_at': document.processed_at.isoformat() if document.processed_at else None,
-        }
+        # Polled every few seconds per processing document; saves drop the entry
+        cache_key = document_status_cache_key(request.user.id, document_id)
+        data = cache.get(cache_key)
+        if data is None:
+            document = get_object_or_404(Document, id=document_id, uploaded_by=request.user)
+            
+            data = {
+                'status': document.status,
+                'chunk_count': document.chunk_count,
+                'processing_error': document.processing_error,
+                'processed_at': document.processed_at.isoformat() if document.processed_at else None,
+            }
+            cache.set(cache_key, data, DOCUMENT_STATUS_CACHE_TIMEOUT)
         
-        return JsonResponse(data)
+        # Unchanged status answers a revalidating poll with an empty 304
+        body = dumps_json(data)
+        etag = quote_etag(hashlib.md5(body).hexdigest())
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = HttpResponse(body, content_type='application/json')
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
         
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
@@ -369,12 +455,11 @@ def query_documents(request):
             try:
                 # Check if this is a conversational query first
                 conversation_handler = get_conversation_handler()
-                user_has_docs = Document.objects.filter(uploaded_by=request.user).exists() if request.user.is_authenticated else False
-                
+                # The document check only matters for conversational replies, so defer it
                 conversational_response = conversation_handler.get_context_aware_response(
                     query_text, 
                     request.user if request.user.is_authenticated else None,
-                    user_has_docs
+                    lambda: Document.objects.filter(uploaded_by=request.user).exists()
                 )
                 
                 if conversational_response:
@@ -382,17 +467,6 @@ def query_documents(request):
                     logger.info(f"Handling conversational query: {query_text}")
                     
                     # Create a simple response object for template compatibility
-                    class ConversationalResponse:
-                        def __init__(self, response_text, query):
-                            self.response_text = response_text
-                            self.query_text = query
-                            self.sources = []
-                            self.total_chunks_found = 0
-                            self.search_time = 0.0
-                            self.llm_time = 0.0
-                            self.total_time = 0.0
-                            self.is_conversational = True
-                    
                     response = ConversationalResponse(conversational_response, query_text)
                     
                     messages.success(
@@ -417,15 +491,12 @@ def query_documents(request):
                 logger.info(f"Selected documents: {[doc.id for doc in selected_documents] if selected_documents else 'All documents'}")
                 logger.info(f"Selected model: {selected_model}")
                 
-                engine = RAGQueryEngine()
-                
                 # Override configuration if provided
-                if similarity_threshold:
-                    engine.config.similarity_threshold = similarity_threshold
-                if max_results:
-                    engine.config.max_chunks = max_results
-                if selected_model:
-                    engine.config.llm_model = selected_model
+                engine = get_rag_engine(
+                    similarity_threshold=similarity_threshold or None,
+                    max_chunks=max_results or None,
+                    llm_model=selected_model or None,
+                )
                 
                 # Process document selection
                 document_ids = None
@@ -477,7 +548,10 @@ def query_documents(request):
                     if selected_documents:
                         query_filter['id__in'] = [doc.id for doc in selected_documents]
                     
-                    matching_docs = Document.objects.filter(**query_filter)[:max_results or 5]
+                    # The results list shows a 50-word preview; fetch a prefix, not the whole text
+                    matching_docs = Document.objects.filter(**query_filter).only(
+                        'id', 'title', 'file_name', 'chunk_count'
+                    ).annotate(content_preview=Left('content', 1000))[:max_results or 5]
                     
                     context = {
                         'query': query_text,
@@ -511,14 +585,11 @@ def api_query(request):
         similarity_threshold = data.get('similarity_threshold')
         max_results = data.get('max_results')
         
-        # Initialize RAG engine
-        engine = RAGQueryEngine()
-        
-        # Override configuration if provided
-        if similarity_threshold is not None:
-            engine.config.similarity_threshold = float(similarity_threshold)
-        if max_results is not None:
-            engine.config.max_chunks = int(max_results)
+        # Initialize RAG engine, overriding configuration if provided
+        engine = get_rag_engine(
+            similarity_threshold=float(similarity_threshold) if similarity_threshold is not None else None,
+            max_chunks=int(max_results) if max_results is not None else None,
+        )
         
         # Process the query
         response = engine.query(
@@ -528,7 +599,7 @@ def api_query(request):
         )
         
         # Return JSON response
-        return JsonResponse(response.to_dict())
+        return OrjsonResponse(response.to_dict())
         
     except json.JSONDecodeError:
         return JsonResponse({'error': 'Invalid JSON'}, status=400)
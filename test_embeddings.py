@@ -11,11 +11,101 @@ sys.path.append('/Users/joe/Documents/RAG')
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'django_rag.settings')
 django.setup()
 
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.db import connection, models, transaction
 from rag_app.models import Document, DocumentChunk, Embedding
-from rag_app.embedding_utils import get_embedding_generator, chunk_text, calculate_content_hash
+from rag_app.embedding_utils import get_embedding_generator, chunk_text, calculate_content_hash, calculate_chunk_hash
+from pgvector import HalfVector
+from pgvector.django import MaxInnerProduct
 import numpy as np
 
+# SimSIMD is optional; NumPy computes the same scores without it
+try:
+    import simsimd
+except ImportError:
+    simsimd = None
+
+# Candidate cascade: a Hamming pass over sign bits keeps BINARY_CANDIDATES
+# rows, an int8 pass narrows those to RERANK_CANDIDATES, which get exact scores
+BINARY_CANDIDATES = 100
+RERANK_CANDIDATES = 20
+
+
+def cosine_scores(vectors, query_embedding):
+    """Exact cosine similarity of each fp16 row against the (unit) query"""
+    if simsimd is not None:
+        # SIMD fp16 kernels run directly on the halfvec values, no fp32 up-conversion
+        distances = simsimd.cdist(
+            query_embedding.astype(np.float16)[np.newaxis, :], vectors, metric='cosine', dtype='f16'
+        )
+        return 1.0 - np.asarray(distances, dtype=np.float32).ravel()
+    # Stored and query vectors are normalized when they're embedded, so one
+    # matrix-vector product gives every cosine similarity
+    return vectors.astype(np.float32) @ query_embedding
+
+
+def binary_candidates(vectors, query_embedding, count):
+    """Indices of the count rows whose sign bits are closest in Hamming distance"""
+    if len(vectors) <= count:
+        return np.arange(len(vectors))
+    # 1 bit per dimension, the same quantization as pgvector's binary_quantize()
+    codes = np.packbits(vectors > 0, axis=1)
+    query_code = np.packbits(query_embedding > 0)
+    distances = np.bitwise_count(codes ^ query_code).sum(axis=1, dtype=np.int32)
+    return np.argpartition(distances, count - 1)[:count]
+
+
+def quantize_int8(vectors):
+    """
+    Per-dimension affine uint8 quantization: vectors ~= codes * scale + shift
+    """
+    vectors = vectors.astype(np.float32)
+    shift = vectors.min(axis=0)
+    scale = (vectors.max(axis=0) - shift) / 255
+    scale[scale == 0] = 1.0  # constant dimensions quantize to 0
+    codes = np.clip(np.round((vectors - shift) / scale), 0, 255).astype(np.uint8)
+    return codes, scale, shift
+
+
+def int8_candidates(vectors, query_embedding, count):
+    """Indices of the count rows with the highest approximate int8 scores"""
+    if len(vectors) <= count:
+        return np.arange(len(vectors))
+    codes, scale, shift = quantize_int8(vectors)
+    # q . x ~= (q * scale) . codes + q . shift
+    approx = codes @ (query_embedding * scale).astype(np.float32) + float(query_embedding @ shift)
+    return np.argpartition(-approx, count - 1)[:count]
+
+
+class HalfvecSend(models.Func):
+    """halfvec_send(vector): the halfvec's binary wire format as bytea"""
+    function = 'halfvec_send'
+    output_field = models.BinaryField()
+
+
+def decode_halfvecs(buffers):
+    """
+    Decode halfvec_send() buffers into an (N, D) float16 array in one pass
+    
+    Each buffer is a 4-byte header (int16 dim, int16 unused) followed by D
+    big-endian fp16 values; all rows share the same dimensions.
+    """
+    raw = np.frombuffer(b''.join(buffers), dtype=np.uint8).reshape(len(buffers), -1)
+    return raw[:, 4:].copy().view('>f2').astype(np.float16)
+
+
+def insert_or_get(model, unique_field, **values):
+    """
+    INSERT ... ON CONFLICT DO NOTHING, then read the row back
+    
+    Two plain statements instead of get_or_create's SELECT, SAVEPOINT,
+    INSERT, RELEASE on a miss. Django 4.2 doesn't return primary keys from
+    conflict-handling bulk inserts, hence the read.
+    """
+    model.objects.bulk_create([model(**values)], ignore_conflicts=True)
+    return model.objects.get(**{unique_field: values[unique_field]})
+
 
 def test_embedding_pipeline():
     """Test the complete embedding pipeline"""
@@ -55,98 +145,159 @@ def test_embedding_pipeline():
     # Step 3: Test database storage
     print("\n3. Testing database storage...")
     
-    # Get or create a test user
-    user, created = User.objects.get_or_create(
-        username='test_user',
-        defaults={'email': 'test@example.com'}
-    )
-    if created:
-        print("   Created test user")
-    
-    # Create a test document
-    content_hash = calculate_content_hash(test_text)
-    document, created = Document.objects.get_or_create(
-        content_hash=content_hash,
-        defaults={
-            'title': 'Test Document',
-            'file_name': 'test.txt',
-            'file_path': '/tmp/test.txt',
-            'file_size': len(test_text),
-            'file_type': 'txt',
-            'mime_type': 'text/plain',
-            'content': test_text,
-            'uploaded_by': user,
-            'status': 'processing'
-        }
-    )
-    if created:
-        print("   Created test document")
-    
-    # Create chunks and embeddings
-    print("   Creating chunks and embeddings...")
-    for chunk_data in chunks:
-        # Create DocumentChunk
-        doc_chunk, created = DocumentChunk.objects.get_or_create(
-            document=document,
-            chunk_index=chunk_data['chunk_index'],
-            defaults={
-                'content': chunk_data['content'],
-                'start_char': chunk_data['start_char'],
-                'end_char': chunk_data['end_char'],
-                'word_count': chunk_data['word_count'],
-                'char_count': chunk_data['char_count'],
-                'token_count': chunk_data['char_count'] // 4,  # rough estimate
-            }
+    # All of step 3's writes commit together instead of one commit per statement
+    with transaction.atomic():
+        if settings.DEBUG:
+            # Test data: don't wait for the WAL flush at COMMIT (a crash can
+            # lose this transaction, never corrupt the database)
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL synchronous_commit = off")
+        
+        # Get or create a test user
+        user = insert_or_get(User, 'username', username='test_user', email='test@example.com')
+        print(f"   Using test user {user.username}")
+        
+        # Create a test document
+        content_hash = calculate_content_hash(test_text)
+        document = insert_or_get(
+            Document, 'content_hash',
+            content_hash=content_hash,
+            title='Test Document',
+            file_name='test.txt',
+            file_path='/tmp/test.txt',
+            file_size=len(test_text),
+            file_type='txt',
+            mime_type='text/plain',
+            content=test_text,
+            uploaded_by=user,
+            status='processing',
         )
+        print(f"   Using test document {document.id}")
         
-        if created:
-            # Generate and store embedding
-            embedding_vector, proc_time = embedding_gen.generate_embedding(chunk_data['content'])
-            
-            Embedding.objects.create(
-                chunk=doc_chunk,
-                vector=embedding_vector.tolist(),  # Convert numpy array to list for pgvector
-                model_name=embedding_gen.model_name,
-                processing_time=proc_time
+        # Create chunks and embeddings
+        print("   Creating chunks and embeddings...")
+        # Only chunks missing from an earlier run are created
+        existing_indexes = set(
+            DocumentChunk.objects.filter(document=document).values_list('chunk_index', flat=True)
+        )
+        new_chunks = [
+            DocumentChunk(
+                document=document,
+                chunk_index=chunk_data['chunk_index'],
+                content=chunk_data['content'],
+                start_char=chunk_data['start_char'],
+                end_char=chunk_data['end_char'],
+                word_count=chunk_data['word_count'],
+                char_count=chunk_data['char_count'],
+                display_header=DocumentChunk.format_header(document.title),
+                content_hash=calculate_chunk_hash(chunk_data['content']),
             )
-            print(f"   Created embedding for chunk {chunk_data['chunk_index']}")
-    
-    # Update document status
-    document.chunk_count = len(chunks)
-    document.status = 'processed'
-    document.save()
+            for chunk_data in chunks
+            if chunk_data['chunk_index'] not in existing_indexes
+        ]
+        
+        if new_chunks:
+            # Chunks whose content is already embedded reuse the stored vector and token count
+            hashes = [doc_chunk.content_hash for doc_chunk in new_chunks]
+            known = Embedding.objects.by_chunk_hash(hashes, embedding_gen.model_name)
+            to_embed = [doc_chunk for doc_chunk in new_chunks if doc_chunk.content_hash not in known]
+            total_time = 0.0
+            if to_embed:
+                # Embed the rest in one batched forward pass; its tokenization gives exact token counts
+                embedded, token_counts, total_time = embedding_gen.generate_embeddings_with_token_counts(
+                    [doc_chunk.content for doc_chunk in to_embed]
+                )
+                known.update(zip(
+                    (doc_chunk.content_hash for doc_chunk in to_embed),
+                    zip(embedded, token_counts.tolist()),
+                ))
+            for doc_chunk in new_chunks:
+                doc_chunk.token_count = known[doc_chunk.content_hash][1]
+            print(f"   Embedded {len(to_embed)} chunks, reused {len(new_chunks) - len(to_embed)}")
+        
+            # Two INSERTs for all rows instead of a round trip per chunk and embedding
+            DocumentChunk.objects.bulk_create(new_chunks)
+            Embedding.objects.bulk_create([
+                Embedding(
+                    chunk=doc_chunk,
+                    vector=known[doc_chunk.content_hash][0].astype(np.float16),  # Stored as halfvec; no fp32 list round trip
+                    model_name=embedding_gen.model_name,
+                    processing_time=total_time / len(new_chunks)  # Average time per chunk
+                )
+                for doc_chunk in new_chunks
+            ])
+            print(f"   Created {len(new_chunks)} chunks with embeddings")
+        
+        # Update document status
+        document.chunk_count = len(chunks)
+        document.status = 'processed'
+        document.save()
     
     # Step 4: Test similarity search
     print("\n4. Testing similarity search...")
     query = "What is Django?"
     query_embedding, _ = embedding_gen.generate_embedding(query)
     
-    # Get all embeddings for similarity search
-    embeddings = Embedding.objects.all()
-    similarities = []
-    
-    for emb in embeddings:
-        # Convert stored vector back to numpy array
-        stored_vector = np.array(emb.vector)
-        similarity = embedding_gen.get_similarity(query_embedding, stored_vector)
-        similarities.append((emb.chunk, similarity))
-    
-    # Sort by similarity (highest first)
-    similarities.sort(key=lambda x: x[1], reverse=True)
+    # Ranked in Postgres: ORDER BY vector <#> query LIMIT 3, which the HNSW index
+    # serves; only the 3 winning rows (without their vectors) come back
+    nearest = Embedding.objects.select_related('chunk').annotate(
+        distance=MaxInnerProduct('vector', HalfVector(query_embedding))
+    ).order_by('distance')[:3]
+    similarities = [(emb.chunk, -emb.distance) for emb in nearest]
     
     print(f"   Query: '{query}'")
     print("   Top 3 most similar chunks:")
-    for i, (chunk, similarity) in enumerate(similarities[:3]):
+    for i, (chunk, similarity) in enumerate(similarities):
         print(f"   {i+1}. Similarity: {similarity:.4f}")
         print(f"      Content: {chunk.content[:100]}...")
     
+    # Step 5: Cross-check the index against a local brute-force ranking
+    print("\n5. Verifying against local brute-force search...")
+    # Raw halfvec bytes instead of a HalfVector object per row
+    rows = list(Embedding.objects.annotate(raw=HalfvecSend('vector')).values_list('chunk_id', 'raw'))
+    
+    if rows:
+        chunk_ids, buffers = zip(*rows)
+        vectors = decode_halfvecs(buffers)
+        
+        # Hamming over every row, int8 over the survivors, exact scores for the last few
+        candidates = binary_candidates(vectors, query_embedding, BINARY_CANDIDATES)
+        candidates = candidates[int8_candidates(vectors[candidates], query_embedding, RERANK_CANDIDATES)]
+        scores = cosine_scores(vectors[candidates], query_embedding)
+        
+        # Quickselect the top 3, then order just those 3 (no full sort of the scores)
+        k = min(3, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        local_ids = [chunk_ids[candidates[i]] for i in top]
+        db_ids = [chunk.id for chunk, _ in similarities]
+        
+        if local_ids == db_ids:
+            print("   Index results match the brute-force top 3")
+        elif set(local_ids) == set(db_ids):
+            print("   Index returned the brute-force top 3 in a different order")
+        else:
+            print(f"   ⚠️ Index and brute-force top 3 differ in {len(set(local_ids) ^ set(db_ids)) // 2} chunk(s)")
+    
     print("\n✅ All tests completed successfully!")
     
     # Cleanup for repeated runs
     print("\n🧹 Cleaning up test data...")
-    Document.objects.filter(title='Test Document').delete()
-    if created:
-        user.delete()
+    if settings.DEBUG and os.getenv('TEST_TRUNCATE_DOCUMENTS') == 'True':
+        # Scratch databases only: empties every document table in one statement
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'TRUNCATE "{Embedding._meta.db_table}", "{DocumentChunk._meta.db_table}", '
+                f'"{Document._meta.db_table}" CASCADE'
+            )
+    else:
+        # One DELETE per table instead of loading every chunk and embedding
+        # into Django's deletion collector
+        test_documents = Document.objects.filter(title='Test Document')
+        DocumentChunk.objects.filter(document__in=test_documents).delete_in_db()
+        test_documents.delete()
+    # test_user only exists for this script
+    user.delete()
     
     return True
 